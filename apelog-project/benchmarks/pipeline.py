@@ -0,0 +1,312 @@
+"""Benchmarks do pipeline carregar → detectar → desenhar, sobre áudio sintético reprodutível.
+
+Uso:
+    python benchmarks/pipeline.py                       # preset "quick" (1 s e 60 s)
+    python benchmarks/pipeline.py --preset full -o new.json
+    python benchmarks/pipeline.py -o new.json --compare old.json
+
+Cada caso é cronometrado `--repeat` vezes (sem tracemalloc) e depois executado uma vez
+com tracemalloc para medir o pico de memória. O resultado é um JSON comparável entre runs.
+"""
+
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from apelog_app.model.audio import MediaModel
+from apelog_app.model.markers import MarkerStore, AUTO, MANUAL
+from apelog_app.model.spectrogram import SpectrogramTiles
+
+SR = 44100
+BLOCK_SECONDS = 60  # geração em blocos: 2 h de áudio não precisam caber na memória
+PRESETS = {
+    "quick": [1, 60],
+    "default": [1, 60, 600],
+    "full": [1, 60, 600, 7200],
+}
+
+# ---------------------------
+# SYNTHETIC AUDIO
+# ---------------------------
+
+def _synth_block(kind, t0, n, channels, rng):
+    """Um bloco de `n` amostras a partir de `t0` segundos."""
+    t = t0 + np.arange(n) / SR
+    y = rng.normal(0.0, 0.1 if kind == "noise" else 0.005, n)
+
+    if kind == "tones":
+        # Rajadas de 0,2 s a cada 2,5 s, alternando 220/440/880 Hz
+        burst = np.floor(t / 2.5)
+        phase = t - burst * 2.5 - 1.0
+        inside = (phase >= 0) & (phase < 0.2)
+        freq = np.array([220.0, 440.0, 880.0])[burst.astype(np.int64) % 3]
+        envelope = np.sin(np.pi * np.clip(phase / 0.2, 0, 1)) * inside
+        y += 0.8 * envelope * np.sin(2 * np.pi * freq * t)
+    elif kind == "clicks":
+        # ~2 cliques por segundo, 5 amostras cada
+        positions = rng.integers(0, max(1, n - 5), size=max(1, int(2 * n / SR)))
+        for offset in range(5):
+            y[positions + offset] += 0.9 * (1 - offset / 5)
+
+    if channels == 1:
+        return np.clip(y, -1, 1)
+    right = 0.8 * y + rng.normal(0.0, 0.005, n)
+    return np.clip(np.column_stack([y, right]), -1, 1)
+
+def synth(path, kind, seconds, channels=1, seed=0, subtype="PCM_16"):
+    """Escreve `seconds` de sinal `kind` (tones/clicks/noise) em `path`, determinístico para o `seed`."""
+    total = int(seconds * SR)
+    with sf.SoundFile(path, "w", SR, channels, subtype=subtype) as f:
+        for b, start in enumerate(range(0, total, BLOCK_SECONDS * SR)):
+            rng = np.random.default_rng([seed, b])  # cada bloco tem seu próprio gerador
+            n = min(BLOCK_SECONDS * SR, total - start)
+            f.write(_synth_block(kind, start / SR, n, channels, rng))
+    return path
+
+# ---------------------------
+# MEASUREMENT
+# ---------------------------
+
+def measure(func, repeat):
+    """Roda `func` `repeat` vezes (tempo) e mais uma sob tracemalloc (pico). Retorna (tempos, pico_bytes)."""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):  # prints de diagnóstico do modelo
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return times, peak
+
+def _loaded_model(path):
+    model = MediaModel()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model._librosa_load(path)
+    return model
+
+def _fresh_load(path):
+    model = MediaModel()
+    model._librosa_load(path)
+    return model
+
+def _render_model(path):
+    """AudioFilesModel desenhando com o backend Agg (sem Kivy)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import apelog_app.model.data as data
+
+    data._plt = plt  # pula o backend Kivy de data.pyplot()
+    model = data.AudioFilesModel()
+    model.disk_cache = None  # cache persistente tornaria os runs seguintes leituras de disco (e sujaria ~/.cache)
+    model.audio_analysis = False
+    return model
+
+def cases(path, flac, seconds):
+    """(nome, função) de cada operação medida sobre o sinal, salvo em `path` (.wav) e `flac`."""
+    model = _loaded_model(path)
+    duration = model.duration
+    points = [(t, 0.8) for t in np.arange(1.1, duration, 2.5)]
+
+    yield "load", lambda: _fresh_load(path)  # .wav PCM: mapeado do disco
+    yield "load.flac", lambda: _fresh_load(flac)  # decodificação em blocos + resumos
+    yield "segment", lambda: model.segment(duration / 2, min(5.0, duration / 2))
+    yield "auto_generate_markers", lambda: model._auto_generate_markers(interval=5.0)
+
+    def detect_with(name):
+        def run():
+            model.detectors = [(name, {})]
+            model._auto_generate_markers(interval=5.0)
+            model.detectors = [("slice_peak", {})]
+        return run
+
+    for name in ("rms", "flux", "zcr"):
+        yield f"detector.{name}", detect_with(name)
+    # A estimativa de frequência trabalha sobre sinais 1-D: no estéreo, mede sobre a média dos canais
+    mono = _loaded_model(path)
+    if np.ndim(mono.y) > 1:
+        mono.y = np.asarray(mono.y).mean(axis=1)
+    yield "estimate_fundamental_freq", lambda: mono._estimate_fundamental_freq(points)
+
+    renderer = _render_model(path)
+
+    def render():
+        fig = renderer.generate_waveform(path)
+        fig.canvas.draw()
+
+    yield "generate_waveform", render
+
+    def spectrogram(t0, t1):
+        # Cache frio: só os tiles visíveis, calculados no pool
+        tiles = SpectrogramTiles()
+        tiles.visible(path, model.y, model.sr, t0, t1, renderer.waveform_pixels())
+        tiles.wait()
+        tiles.shutdown()
+
+    yield "spectrogram.full_view", lambda: spectrogram(0.0, duration)
+    yield "spectrogram.zoom_1s", lambda: spectrogram(duration / 2, duration / 2 + 1.0)
+
+    # Atualização de marcadores: inserção em lote, edição pontual e redesenho da camada
+    times = np.random.default_rng(0).uniform(0, duration, size=max(10, int(seconds * 10)))
+
+    def markers_bulk():
+        MarkerStore().add_many(times, kind=AUTO)
+
+    store = MarkerStore()
+    store.add_many(times, kind=AUTO)
+
+    def markers_edit():
+        ids = [store.add(t, MANUAL) for t in times[:100]]
+        for marker_id in ids:
+            store.remove(marker_id)
+
+    def markers_draw():
+        renderer.marker_layer.update(store, 0.0, duration, renderer.waveform_pixels())
+
+    yield "markers.add_many", markers_bulk
+    yield "markers.add_remove_100", markers_edit
+    yield "markers.layer_update", markers_draw
+
+    table = _table_controller(store)
+    if table is not None:
+        def table_diff():
+            ids = [store.add(t, MANUAL) for t in times[:100]]
+            table.apply(inserted=ids)
+            for marker_id in ids:
+                store.remove(marker_id)
+            table.apply(deleted=ids)
+
+        yield "table.rows", table.rows
+        yield "table.apply_100", table_diff
+
+    renderer.prefetcher.shutdown()
+    import matplotlib.pyplot as plt
+    plt.close(renderer.fig)
+
+def _table_controller(store):
+    """TableController sobre uma tabela falsa (lista); None se o Kivy não estiver instalado."""
+    try:
+        from apelog_app.controller.main_controller import TableController
+    except ImportError:
+        return None
+    table = TableController(main_controller=None)
+    table.event_table = type("Table", (), {"data": []})()
+    with contextlib.redirect_stdout(io.StringIO()):
+        table.show(store, "bench.wav")
+    return table
+
+# ---------------------------
+# RUN / COMPARE
+# ---------------------------
+
+def run(durations, kinds, channels, repeat, seed, workdir):
+    results = []
+    for seconds in durations:
+        for kind in kinds:
+            for ch in channels:
+                signal = f"{kind}-{'mono' if ch == 1 else 'stereo'}-{seconds:g}s"
+                path = synth(os.path.join(workdir, f"{signal}.wav"), kind, seconds, ch, seed)
+                flac = synth(os.path.join(workdir, f"{signal}.flac"), kind, seconds, ch, seed)
+                try:
+                    for name, func in cases(path, flac, seconds):
+                        results.append(_run_case(signal, name, func, repeat))
+                except Exception as e:
+                    results.append({"signal": signal, "case": "setup", "error": str(e)})
+                    print(f"{signal:<24} setup: erro: {e}", file=sys.stderr)
+                os.remove(path)
+                os.remove(flac)
+    return results
+
+def _run_case(signal, name, func, repeat):
+    result = {"signal": signal, "case": name}
+    try:
+        times, peak = measure(func, repeat)
+        result.update(
+            min_s=min(times), median_s=statistics.median(times), mean_s=statistics.fmean(times),
+            repeat=repeat, peak_mb=peak / 1024 ** 2,
+        )
+        print(f"{signal:<24} {name:<28} {result['median_s'] * 1e3:10.2f} ms {result['peak_mb']:9.1f} MB",
+              file=sys.stderr)
+    except Exception as e:
+        result["error"] = str(e)
+        print(f"{signal:<24} {name:<28} erro: {e}", file=sys.stderr)
+    return result
+
+def compare(results, baseline_path):
+    """Imprime a razão novo/antigo da mediana de cada caso presente nos dois runs."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["signal"], r["case"]): r for r in json.load(f)["results"]}
+    print(f"\n{'signal':<24} {'case':<28} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    for r in results:
+        old = baseline.get((r["signal"], r["case"]))
+        if old is None or "median_s" not in old or "median_s" not in r:
+            continue
+        ratio = r["median_s"] / old["median_s"] if old["median_s"] else float("inf")
+        print(f"{r['signal']:<24} {r['case']:<28} {old['median_s'] * 1e3:10.2f} "
+              f"{r['median_s'] * 1e3:10.2f} {ratio:7.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline do Apelog.")
+    parser.add_argument("--preset", choices=PRESETS, default="quick", help="durações a testar (padrão: quick)")
+    parser.add_argument("--durations", help="durações em segundos separadas por vírgula (substitui --preset)")
+    parser.add_argument("--kinds", default="tones,clicks,noise", help="sinais sintéticos (padrão: tones,clicks,noise)")
+    parser.add_argument("--channels", default="1,2", help="canais a testar (padrão: 1,2)")
+    parser.add_argument("--repeat", type=int, default=3, help="repetições cronometradas por caso (padrão: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="semente do gerador (padrão: 0)")
+    parser.add_argument("-o", "--output", default="-", help="JSON de saída (padrão: stdout)")
+    parser.add_argument("--compare", help="JSON de um run anterior para comparar")
+    args = parser.parse_args(argv)
+
+    durations = [float(d) for d in args.durations.split(",")] if args.durations else PRESETS[args.preset]
+    channels = [int(c) for c in args.channels.split(",")]
+    with tempfile.TemporaryDirectory(prefix="apelog-bench-") as workdir:
+        results = run(durations, args.kinds.split(","), channels, args.repeat, args.seed, workdir)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
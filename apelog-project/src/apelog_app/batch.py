@@ -0,0 +1,210 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import soundfile as sf
+
+from apelog_app.model.analysis_cache import AnalysisCache
+from apelog_app.model.audio import MediaModel, AUDIO_EXTENSIONS
+from apelog_app.model.detectors import DETECTORS, parse_stage, validate_chain
+from apelog_app import profiling
+
+# ---------------------------
+# WORKER
+# ---------------------------
+
+_model = None  # um MediaModel por processo worker, reaproveitado entre arquivos
+
+def _init_worker(profile=False, channel_mode="downmix", detectors=None, cache=True, cache_dir=None):
+    global _model
+    sys.stdout = sys.stderr  # prints de diagnóstico do modelo não podem se misturar à saída em stdout
+    if profile:
+        profiling.enable()
+    _model = MediaModel()
+    _model.cache.max_bytes = 0  # cada arquivo é visto uma vez só: nada a ganhar com cache
+    _model.channel_mode = channel_mode
+    if detectors:
+        _model.detectors = detectors
+    if cache:
+        _model.disk_cache = AnalysisCache(cache_dir)  # repetir o lote só analisa o que mudou
+
+def analyze_file(file_path, interval=5.0):
+    """Detecta os marcadores de um arquivo. Roda no processo worker; retorna um dict serializável."""
+    model = _model if _model is not None else MediaModel()
+    start = time.perf_counter()
+    result = {"file": file_path, "duration": None, "sample_rate": None, "markers": [], "error": None}
+    try:
+        points = model.cached_markers(file_path, interval)
+        if points is not None:
+            # Marcadores já calculados para este conteúdo e estes parâmetros: só o cabeçalho é lido
+            info = sf.info(file_path)
+            result["duration"] = info.frames / info.samplerate
+            result["sample_rate"] = info.samplerate
+        else:
+            if not model._librosa_load(file_path):
+                raise RuntimeError("não foi possível decodificar o arquivo")
+            result["duration"] = model.duration
+            result["sample_rate"] = model.sr
+            points = model._detect_markers(interval=interval)  # o cache em disco já foi consultado acima
+        result["markers"] = [{"time": float(t), "amplitude": float(amp)} for t, amp in points]
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        model.cache.discard(file_path)
+        model.y = model.entry = model.peaks = model.stats = None
+    result["elapsed"] = time.perf_counter() - start
+    if profiling.enabled():
+        result["profile"] = profiling.drain()  # o processo principal junta os spans de todos os workers
+    return result
+
+# ---------------------------
+# INPUT / OUTPUT
+# ---------------------------
+
+def collect_files(paths):
+    """Expande arquivos e diretórios (recursivamente) na lista de áudios suportados, sem repetidos."""
+    files = []
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = (
+                os.path.join(root, name)
+                for root, _, names in sorted(os.walk(path))
+                for name in sorted(names)
+            )
+        else:
+            candidates = [path]
+        for candidate in candidates:
+            candidate = os.path.abspath(candidate)
+            if candidate.lower().endswith(AUDIO_EXTENSIONS) and os.path.isfile(candidate) and candidate not in seen:
+                seen.add(candidate)
+                files.append(candidate)
+    return files
+
+class ResultWriter:
+    """Escreve cada resultado assim que ele chega (CSV: uma linha por marcador; JSONL: uma por arquivo)."""
+
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == "csv":
+            self._csv = csv.writer(stream)
+            self._csv.writerow(["file", "time", "amplitude"])
+
+    def write(self, result):
+        if self.fmt == "csv":
+            for marker in result["markers"]:
+                self._csv.writerow([result["file"], f"{marker['time']:.6f}", f"{marker['amplitude']:.6f}"])
+        else:
+            self.stream.write(json.dumps({k: v for k, v in result.items() if k != "profile"}, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+# ---------------------------
+# CLI
+# ---------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="apelog-batch",
+        description="Detecção de eventos em lote, sem interface gráfica.",
+    )
+    parser.add_argument("paths", nargs="+", help="arquivos de áudio ou diretórios (percorridos recursivamente)")
+    parser.add_argument("-o", "--output", default="-", help="arquivo de saída (padrão: stdout)")
+    parser.add_argument("-f", "--format", choices=("csv", "jsonl"),
+                        help="formato da saída (padrão: pela extensão de --output, senão csv)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="processos em paralelo (padrão: número de CPUs)")
+    parser.add_argument("--interval", type=float, default=5.0, help="janela de detecção em segundos (padrão: 5.0)")
+    parser.add_argument("--channels", choices=("downmix", "channels"), default="downmix",
+                        help="áudio multicanal: analisa a média dos canais ou cada canal (padrão: downmix)")
+    parser.add_argument("--detector", action="append", metavar="NOME[:k=v,...]",
+                        help="detector da cadeia, repetível e na ordem: o 1º gera eventos, os outros filtram "
+                             f"({', '.join(DETECTORS)}; padrão: slice_peak)")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="cache de análise em disco (padrão: $APELOG_CACHE_DIR ou ~/.cache/apelog)")
+    parser.add_argument("--no-cache", action="store_true", help="não lê nem grava o cache de análise em disco")
+    parser.add_argument("-q", "--quiet", action="store_true", help="não mostra o progresso no stderr")
+    parser.add_argument("--profile", metavar="TRACE.json", help="mede as etapas e salva um Chrome trace")
+    return parser.parse_args(argv)
+
+def run(files, writer, workers=1, interval=5.0, progress=None, channel_mode="downmix", detectors=None,
+        cache=True, cache_dir=None):
+    """Analisa `files` num pool de processos, entregando cada resultado ao `writer` na ordem em que terminam.
+
+    Retorna o número de arquivos que falharam.
+    """
+    failed = 0
+    with ProcessPoolExecutor(
+        max_workers=max(1, workers), initializer=_init_worker,
+        initargs=(profiling.enabled(), channel_mode, detectors, cache, cache_dir),
+    ) as pool:
+        futures = [pool.submit(analyze_file, path, interval) for path in files]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            if "profile" in result:
+                profiling.merge(result.pop("profile"))
+            if result["error"]:
+                failed += 1
+            writer.write(result)
+            if progress is not None:
+                progress(done, len(files), result)
+    return failed
+
+def _print_progress(done, total, result):
+    name = os.path.basename(result["file"])
+    if result["error"]:
+        status = f"erro: {result['error']}"
+    else:
+        status = f"{len(result['markers'])} marcadores"
+    print(f"[{done}/{total}] {name} - {status} ({result['elapsed']:.2f}s)", file=sys.stderr, flush=True)
+
+def main(argv=None):
+    args = parse_args(argv)
+    fmt = args.format or ("jsonl" if args.output.lower().endswith((".jsonl", ".json")) else "csv")
+
+    try:
+        detectors = [parse_stage(stage) for stage in args.detector] if args.detector else None
+        if detectors:
+            validate_chain(detectors)
+    except ValueError as e:
+        print(f"Cadeia de detectores inválida: {e}", file=sys.stderr)
+        return 2
+
+    files = collect_files(args.paths)
+    if not files:
+        print("Nenhum arquivo de áudio encontrado.", file=sys.stderr)
+        return 1
+
+    trace_path = args.profile or profiling.TRACE_PATH
+    if trace_path:
+        profiling.enable()
+
+    start = time.perf_counter()
+    stream = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        failed = run(
+            files, ResultWriter(stream, fmt), workers=args.workers, interval=args.interval,
+            progress=None if args.quiet else _print_progress, channel_mode=args.channels, detectors=detectors,
+            cache=not args.no_cache, cache_dir=args.cache_dir,
+        )
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    if not args.quiet:
+        print(f"{len(files)} arquivos em {time.perf_counter() - start:.1f}s ({failed} com erro).", file=sys.stderr)
+    if trace_path:
+        print(profiling.report(), file=sys.stderr)
+        print(f"Trace salvo em {profiling.export_chrome_trace(trace_path)}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
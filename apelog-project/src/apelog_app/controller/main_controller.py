@@ -1,91 +1,136 @@
-from kivy.metrics import dp
 from kivy.clock import Clock
 
 from kivy.properties import ListProperty
-from kivy_matplotlib_widget.uix.graph_widget import MatplotFigure
 from kivy.uix.boxlayout import BoxLayout
-from kivymd.uix.boxlayout import MDBoxLayout
-from kivymd.uix.menu import MDDropdownMenu
-from kivymd.uix.datatables import MDDataTable
-from kivymd.uix.dialog import MDDialog
-from kivymd.uix.textfield import MDTextField
-from kivymd.uix.button import MDFlatButton
+from kivy.uix.image import Image
+# Diálogos do KivyMD, tkinter e o widget do matplotlib são importados no primeiro uso (startup mais rápido)
 
 import numpy as np
 import os
+import bisect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 import apelog_app.model.data as model
-from apelog_app.view.file_chooser import browse_files
-from tkinter import Tk, Listbox, Toplevel, Button
+from apelog_app.model.live import LiveDetector
+from apelog_app.model.export import SegmentExporter, clips_around, clips_between
+from apelog_app.model.detectors import DETECTORS, format_params, parse_params, validate_chain
+from apelog_app import profiling
+from apelog_app.view.file_chooser import browse_files, browse_save_file
+from apelog_app.view.event_table import EventTable
+
+LOADING_GIF = Path(__file__).parent.parent.parent / "assets" / "loading.gif"
+MIN_VIEW_SAMPLES = 32  # menor intervalo visível no zoom, em amostras
+ZOOM_STEP = 1.25  # fator de zoom por passo da roda do mouse
 
 # TODO: consertar bugs ao remover, exportar csv
 
 class TableController:
     """Controlador da tabela de eventos."""
+    BULK_DIFF = 512  # acima disso, recarrega a tabela inteira numa atribuição só
+
     def __init__(self, main_controller):
         self.main_controller = main_controller
         self.dialog = None
-        self.data_tables = None
-        self.events = []
-        self.selected_row_index = None
+        self.event_table = None
+        self.store = None  # MarkerStore do arquivo exibido (compartilhado com o modelo e o canvas)
+        self.audio_name = ""
+        self._row_time = {}  # {id: tempo} das linhas exibidas (acha a linha mesmo após sair do store)
+        self.selected_marker_id = None
 
     def create_table(self):
         """Cria ou atualiza a tabela de eventos na view."""
-        self.data_tables = MDDataTable(
-            size_hint=(0.8, 0.8),
-            use_pagination=True,
-            check=False,
-            column_data=[
-                ("No.", dp(20)),
-                ("Timestamp", dp(30)),
-                ("Title", dp(50)),
-                ("Description", dp(60)),
-                ("Audio name", dp(50)),
-            ],
-        )
-
-        self.data_tables.row_data = self.events
-
-        # Vincula evento de clique na linha
-        self.data_tables.bind(on_row_press=self.on_row_press)
+        # RecycleView: só as linhas visíveis viram widgets, reaproveitados na rolagem
+        self.event_table = EventTable()
+        self.event_table.data = self.rows()
 
         container = self.main_controller.ids.events_table_container
         container.clear_widgets()
-        container.add_widget(self.data_tables)
+        container.add_widget(self.event_table)
         print('Tabela de eventos criada.')
 
-    def update_events(self, events, audio_name="audio.mp3"):
-        """Atualiza os eventos na tabela."""
-        ts = events[-1]
-        title = f"Event at {ts:.3f}s"
-        desc = "Marked manually"
-        name = os.path.basename(audio_name)
-        self.events.append((f"{ts:.3f}s", title, desc, name))
-            
-        print(f'Atualizando eventos: {self.events}')
+    def show(self, store, audio_name="audio.mp3"):
+        """Passa a exibir os marcadores de `store` (arquivo `audio_name`)."""
+        self.store = store
+        self.audio_name = os.path.basename(audio_name)
+        self.update_table()
+
+    def row(self, marker_id):
+        """Dados da linha de um marcador (dict consumido pelo EventRow)."""
+        ts = self.store.time_of[marker_id]
+        info = self.store.info.get(marker_id, {})
+        manual = self.store.kinds[marker_id] == model.MANUAL
+        return {
+            "marker_id": marker_id,
+            "time": ts,
+            "timestamp": f"{ts:.3f}s",
+            "title": info.get("title", f"Event at {ts:.3f}s"),
+            "description": info.get("description", "Marked manually" if manual else "Detected automatically"),
+            "audio_name": self.audio_name,
+        }
+
+    def rows(self):
+        """Linhas da tabela na ordem de tempo dos marcadores."""
+        if self.store is None:
+            return []
+        return [self.row(marker_id) for marker_id, _ in self.store]
 
+    @profiling.traced("table_update")
     def update_table(self):
-        """Atualiza visualmente a tabela com os eventos atuais."""
-        if self.data_tables:
-            self.data_tables.row_data = [
-                (i+1, t[0], t[1], t[2], t[3])
-                for i, t in enumerate(self.events)
-            ]
-            print('Eventos na tabela atualizados.')
-
-    def add_row(self):
-        """Adiciona uma nova linha à tabela."""
-        self.data_tables.add_row((len(self.events),
-                                  self.events[-1][0],
-                                  self.events[-1][1],
-                                  self.events[-1][2],
-                                  self.events[-1][3]))
-        print(f'Linha adicionada: {self.events[-1]}')
+        """Recarrega a tabela inteira de uma vez (troca de arquivo, cargas em lote)."""
+        if self.event_table:
+            rows = self.rows()
+            self._row_time = {row["marker_id"]: row["time"] for row in rows}
+            self.event_table.data = rows
+            print(f'Eventos na tabela atualizados ({len(rows)}).')
+
+    @profiling.traced("table_update")
+    def apply(self, inserted=(), updated=(), deleted=()):
+        """Aplica um lote de mudanças por ID de marcador, já refletidas no store.
+
+        Só as linhas afetadas mudam; o RecycleView recalcula o layout uma vez por frame.
+        """
+        if not self.event_table or self.store is None:
+            return
+        if len(inserted) + len(deleted) > self.BULK_DIFF:
+            self.update_table()
+            return
+
+        data = self.event_table.data
+        for marker_id in deleted:
+            pos = self._position(marker_id)
+            if pos is not None:
+                del data[pos]
+            self._row_time.pop(marker_id, None)
+        # Em ordem crescente de posição final, cada linha cai direto no lugar certo
+        for marker_id in sorted(inserted, key=self.store.rank):
+            data.insert(self.store.rank(marker_id), self.row(marker_id))
+            self._row_time[marker_id] = self.store.time_of[marker_id]
+        for marker_id in updated:
+            pos = self._position(marker_id)
+            if pos is not None:
+                data[pos] = self.row(marker_id)
+
+    def _position(self, marker_id):
+        """Índice da linha de um marcador (busca binária pelo tempo), ou None."""
+        data = self.event_table.data
+        ts = self._row_time.get(marker_id)
+        if ts is None:
+            return None
+        pos = bisect.bisect_left(data, ts, key=lambda row: row["time"])
+        while pos < len(data) and data[pos]["time"] == ts:
+            if data[pos]["marker_id"] == marker_id:
+                return pos
+            pos += 1
+        return None
 
     def remove_selected(self):
-        """Remove os eventos selecionados na tabela e retorna os índices dos selecionados."""
-        if not self.data_tables:
+        """Pergunta quais eventos remover e retorna os IDs dos marcadores selecionados."""
+        if not self.event_table or self.store is None:
             return []
+        from tkinter import Tk, Listbox, Toplevel, Button
 
         # Cria a janela principal do Tkinter
         root = Tk()
@@ -97,8 +142,8 @@ class TableController:
 
         # Cria uma Listbox para exibir os índices e timestamps (multiselecionável)
         listbox = Listbox(dialog, width=50, height=20, selectmode="multiple")
-        for i, row in enumerate(self.data_tables.row_data):
-            listbox.insert("end", f"({i+1:02}) - Title: {row[2]} | Timestamp: {row[1]}")
+        for i, row in enumerate(self.event_table.data):
+            listbox.insert("end", f"({i+1:02}) - Title: {row['title']} | Timestamp: {row['timestamp']}")
         listbox.pack(padx=10, pady=10)
 
         selected_indices = []
@@ -123,33 +168,23 @@ class TableController:
         # Mantém o diálogo aberto
         root.mainloop()
 
-        # Remove os eventos selecionados da tabela e da lista de eventos
-        for i in sorted(selected_indices, reverse=True):
-            del self.events[i]
-
-        return selected_indices
+        return [self.event_table.data[i]["marker_id"] for i in selected_indices]
 
-    def on_row_press(self, instance_table, instance_row):
+    def on_row_press(self, row):
         """Chamado ao clicar numa linha da tabela."""
         try:
-            num_cols = len(self.data_tables.column_data)
-            cell_index = instance_row.index
-            row_index = cell_index // num_cols  # converte para índice de linha real
-
-            print(f"Linha clicada: {row_index} (coluna {cell_index % num_cols})")
-            self.selected_row_index = row_index
-
-            if cell_index % num_cols != 0:
-                row_data = self.data_tables.row_data[row_index]
-                self.open_edit_dialog(row_data)
+            print(f"Linha clicada: {row.index} (marcador {row.marker_id})")
+            self.selected_marker_id = int(row.marker_id)
+            self.open_edit_dialog(row.index + 1, row.title, row.description)
 
         except Exception as e:
             print(f"Erro ao abrir diálogo de edição: {e}")
             return
 
-    def open_edit_dialog(self, row_data):
+    def open_edit_dialog(self, no, title, desc):
         """Abre o diálogo de edição da linha."""
-        no, timestamp, title, desc, file = row_data
+        from kivymd.uix.dialog import MDDialog
+        from kivymd.uix.button import MDFlatButton
 
         self.dialog = MDDialog(
             title=f"Editar evento #{no}",
@@ -167,23 +202,19 @@ class TableController:
         new_title = self.title_field.text
         new_desc = self.desc_field.text
 
-        index = self.selected_row_index
-        no, timestamp, _, _, file = self.data_tables.row_data[index]
-        self.data_tables.row_data[index] = (no, timestamp, new_title, new_desc, file)
-        self.events[index] = (no, timestamp, new_title, new_desc, file)
-
-        # Atualiza visualmente a tabela
-        self.data_tables.update_row_data(
-            self.data_tables,
-            self.data_tables.row_data
-        )
-
-        print(f"Linha {no} atualizada: {new_title}, {new_desc}")
+        marker_id = self.selected_marker_id
+        if marker_id in self.store:
+            self.store.info[marker_id] = {"title": new_title, "description": new_desc}
+            self.apply(updated=[marker_id])
+            print(f"Marcador {marker_id} atualizado: {new_title}, {new_desc}")
 
         self.dialog.dismiss()
 
     def _create_dialog_content(self, title, desc):
         """Cria o conteúdo do diálogo."""
+        from kivymd.uix.boxlayout import MDBoxLayout
+        from kivymd.uix.textfield import MDTextField
+
         layout = MDBoxLayout(orientation="vertical", spacing=10, adaptive_height=True)
         self.title_field = MDTextField(text=title, hint_text="Título")
         self.desc_field = MDTextField(text=desc, hint_text="Descrição")
@@ -200,20 +231,73 @@ class CanvasController():
         self.audio_selected = main_controller.audio_selected
         self.touch_mode = 'cursor'
         self.selected_audio_x_pos = 0.0
-        self.markers_pos = []  # lista de marcadores criados
         self.figure_widget = None  # guardará a referência para o gráfico atual
+        self.blit_playhead = True  # redesenha só a barra de posição sobre um fundo em cache
+
+        # Pipeline assíncrono da waveform: um worker, jobs antigos descartados
+        self._waveform_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="apelog-waveform")
+        self._waveform_job = 0
+        self._waveform_cancel = None
+
+        # Tiles do espectrograma chegam dos workers; vários no mesmo frame viram um redesenho
+        self._spectrogram_trigger = Clock.create_trigger(lambda dt: self._on_spectrogram_tiles())
+        self.audio_controller.spectrogram.on_ready = self._spectrogram_trigger
 
     def draw_waveform(self):
-        """Desenha a waveform do áudio selecionado"""
-        # {file_path: [(time, amplitude), ...]}
-        for m in self.main_controller.audio_controller.markers.get(self.audio_selected, []):
-            self.main_controller.table_controller.update_events([m[0]], self.audio_selected)
-        self.main_controller.table_controller.update_table()
+        """Desenha a waveform do áudio selecionado (processamento pesado num worker)."""
+        # Invalida o job anterior: se ainda estiver rodando, para no próximo bloco
+        if self._waveform_cancel is not None:
+            self._waveform_cancel.set()
+        self._waveform_job += 1
+        self._waveform_cancel = cancelled = threading.Event()
+
+        self._show_loading()
+        n_pixels = self.audio_controller.waveform_pixels()
+        self._waveform_executor.submit(
+            self._waveform_worker, self._waveform_job, self.audio_selected, n_pixels, cancelled
+        )
+
+    def _show_loading(self):
+        """Mostra o placeholder de carregamento no lugar da waveform."""
+        self.figure_widget = None
+        container = self.main_controller.ids.waveform_container
+        container.clear_widgets()
+        container.add_widget(Image(source=str(LOADING_GIF), anim_delay=0.05, fit_mode="contain"))
 
-        # Gera a figura do waveform
-        fig = self.audio_controller.generate_waveform(self.audio_selected)
+    def _waveform_worker(self, job, file_path, n_pixels, cancelled):
+        """Roda fora da thread da UI: decodificação, resumos e detecção."""
+        try:
+            data = self.audio_controller.prepare_waveform(file_path, n_pixels, cancelled)
+        except Exception as e:
+            print(f"Erro ao gerar waveform: {e}")
+            data = None
+        if cancelled.is_set():
+            return
+        Clock.schedule_once(lambda dt: self._on_waveform_ready(job, data))
+
+    def _on_waveform_ready(self, job, data):
+        """De volta na thread da UI: desenha o resultado se ele ainda for o do arquivo selecionado."""
+        if job != self._waveform_job:
+            return  # o usuário já selecionou outro arquivo
+        if data is None:
+            self.main_controller.ids.waveform_container.clear_widgets()
+            return
+
+        try:
+            fig = self.audio_controller.render_waveform(data)
+        except Exception as e:
+            print(f"Erro ao gerar waveform: {e}")
+            self.main_controller.ids.waveform_container.clear_widgets()
+            return
+
+        store = self.audio_controller.marker_store(self.audio_selected)
+        table = self.main_controller.table_controller
+        if self.main_controller.live_store is not None and table.store is self.main_controller.live_store:
+            print("Eventos ao vivo continuam disponíveis em Tools > Live Events.")
+        table.show(store, self.audio_selected)
 
         # Cria o widget Matplotlib
+        from kivy_matplotlib_widget.uix.graph_widget import MatplotFigure
         figure_widget = MatplotFigure()
         figure_widget.figure = fig
         figure_widget.fast_draw = True
@@ -252,7 +336,8 @@ class CanvasController():
             x=0.0,
             color='#d42912',
             linewidth=2.0,
-            zorder=10
+            zorder=10,
+            animated=self.blit_playhead  # fica fora do fundo estático em cache
         )
 
         # Cria anotação (texto) que mostra o tempo
@@ -264,9 +349,15 @@ class CanvasController():
             va='bottom',
             fontsize=9,
             color='white',
-            bbox=dict(boxstyle='round,pad=0.3', fc='#ca8c18', ec='white', alpha=0.95)
+            bbox=dict(boxstyle='round,pad=0.3', fc='#ca8c18', ec='white', alpha=0.95),
+            animated=self.blit_playhead
         )
 
+        # Fundo estático (waveform + marcadores) usado no modo blit; refeito quando o widget muda de tamanho
+        figure_widget.playhead_background = None
+        figure_widget.bind(size=lambda *args: self._invalidate_background())
+        Clock.schedule_once(lambda dt: self._redraw_playhead())
+
         # --- FUNÇÃO AUXILIAR PARA MOVER A BARRA ---
         def update_bar_position(instance, touch):
             """Atualiza posição da barra conforme toque/arraste"""
@@ -279,41 +370,47 @@ class CanvasController():
             rel_x = (touch.x - instance.x) / instance.width
             self.selected_audio_x_pos = np.clip(xlim[0] + rel_x * (xlim[1] - xlim[0]), xlim[0], xlim[1])
 
-            # Atualiza posição da linha
-            instance.position_line.set_xdata([self.selected_audio_x_pos, self.selected_audio_x_pos])
             instance.position_value = self.selected_audio_x_pos
-
-            # Atualiza anotação de tempo
-            if hasattr(instance, 'position_annotation'):
-                instance.position_annotation.set_position((self.selected_audio_x_pos, 1.02))
-                instance.position_annotation.set_text(f"{self.selected_audio_x_pos:.3f} s")
-
-            try:
-                self.audio_controller.seek(self.selected_audio_x_pos)
-                self.main_controller.ids.play_btn.icon = "play"
-                instance.figure.canvas.draw_idle()
-            except:
-                instance.figure.canvas.draw()
-            instance._draw_bitmap()
+            self.audio_controller.seek(self.selected_audio_x_pos)
+            self.main_controller.ids.play_btn.icon = "play"
+            self._move_playhead(self.selected_audio_x_pos)
 
         # --- EVENTOS DE TOQUE / ARRASTE ---
+        # Dois toques simultâneos = pinça (zoom); roda do mouse = zoom, roda lateral = pan
+        figure_widget._pinch = {}
+
         def on_touch_down(instance, touch):
             if not instance.collide_point(*touch.pos):
                 return False
             if instance.touch_mode != 'cursor':
                 return False
 
+            if touch.is_mouse_scrolling:
+                self._on_scroll(instance, touch)
+                return True
+
+            instance._pinch[touch.uid] = touch.x
+            if len(instance._pinch) == 2:
+                instance._dragging_bar = False
+                instance._pinch_start = self._pinch_state(instance)
+                return True
+
             instance._dragging_bar = True
             update_bar_position(instance, touch)
             return True
 
         def on_touch_move(instance, touch):
+            if touch.uid in instance._pinch and len(instance._pinch) == 2:
+                instance._pinch[touch.uid] = touch.x
+                self._on_pinch(instance)
+                return True
             if getattr(instance, '_dragging_bar', False):
                 update_bar_position(instance, touch)
                 return True
             return False
 
         def on_touch_up(instance, touch):
+            instance._pinch.pop(touch.uid, None)
             instance._dragging_bar = False
             return True
 
@@ -331,63 +428,168 @@ class CanvasController():
         if not self.figure_widget or not self.figure_widget.waveform_data:
             return
 
-        xlim = self.figure_widget.waveform_data['xlim']
-        self.selected_audio_x_pos = np.clip(new_time, xlim[0], xlim[1])
+        self.selected_audio_x_pos = np.clip(new_time, 0.0, self.audio_controller.duration)
 
-        # Atualiza linha e anotação
-        self.figure_widget.position_line.set_xdata(
-            [self.selected_audio_x_pos, self.selected_audio_x_pos]
-        )
-        self.figure_widget.position_annotation.set_position(
-            (self.selected_audio_x_pos, 1.02)
-        )
-        self.figure_widget.position_annotation.set_text(f"{self.selected_audio_x_pos:.3f} s")
+        # Com zoom, a visão acompanha a reprodução página a página
+        t0, t1 = self.audio_controller.view
+        if not t0 <= self.selected_audio_x_pos <= t1:
+            self.zoom(self.selected_audio_x_pos, self.selected_audio_x_pos + (t1 - t0))
 
-        try:
-            self.figure_widget.figure.canvas.draw_idle()
-        except:
-            self.figure_widget.figure.canvas.draw()
-        self.figure_widget._draw_bitmap()
+        self._move_playhead(self.selected_audio_x_pos)
+
+    # ---------------------------
+    # VIEWPORT (ZOOM / PAN)
+    # ---------------------------
+
+    def zoom(self, t0: float, t1: float):
+        """Mostra só o intervalo [t0, t1] (s) da waveform, no nível de detalhe que cabe na largura."""
+        if not self.figure_widget or not self.figure_widget.waveform_data:
+            return
+        duration = self.audio_controller.duration
+        min_span = min(duration, MIN_VIEW_SAMPLES / self.audio_controller.sr)
+        span = float(np.clip(t1 - t0, min_span, duration))
+        t0 = float(np.clip(t0, 0.0, duration - span))
+
+        self.audio_controller.set_waveform_view(t0, t0 + span)
+        self.figure_widget.waveform_data['xlim'] = (t0, t0 + span)
+        self.figure_widget.playhead_background = None
+        self._redraw_playhead()
+
+    def zoom_at(self, center: float, factor: float):
+        """Aproxima (factor < 1) ou afasta (factor > 1) mantendo `center` no mesmo ponto da tela."""
+        t0, t1 = self.audio_controller.view
+        rel = (center - t0) / (t1 - t0)
+        span = (t1 - t0) * factor
+        self.zoom(center - rel * span, center - rel * span + span)
+
+    def pan(self, dt: float):
+        """Desloca a visão em `dt` segundos."""
+        t0, t1 = self.audio_controller.view
+        self.zoom(t0 + dt, t1 + dt)
+
+    def reset_zoom(self):
+        """Volta a mostrar o arquivo inteiro."""
+        self.zoom(0.0, self.audio_controller.duration)
+
+    def _touch_time(self, instance, x):
+        """Converte a coordenada x de um toque no tempo (s) correspondente da visão atual."""
+        t0, t1 = instance.waveform_data['xlim']
+        return t0 + (x - instance.x) / instance.width * (t1 - t0)
+
+    def _on_scroll(self, instance, touch):
+        """Roda do mouse: vertical dá zoom em torno do cursor, horizontal faz pan."""
+        if not instance.waveform_data:
+            return
+        t0, t1 = instance.waveform_data['xlim']
+        if touch.button == 'scrolldown':
+            self.zoom_at(self._touch_time(instance, touch.x), 1 / ZOOM_STEP)
+        elif touch.button == 'scrollup':
+            self.zoom_at(self._touch_time(instance, touch.x), ZOOM_STEP)
+        elif touch.button == 'scrollleft':
+            self.pan(-(t1 - t0) * 0.1)
+        elif touch.button == 'scrollright':
+            self.pan((t1 - t0) * 0.1)
+
+    def _pinch_state(self, instance):
+        """Distância entre os dedos, visão e centro (px) no início da pinça."""
+        x0, x1 = instance._pinch.values()
+        return abs(x1 - x0), self.audio_controller.view, (x0 + x1) / 2
+
+    def _on_pinch(self, instance):
+        """Pinça: afastar os dedos aproxima, juntar afasta (relativo ao início do gesto)."""
+        start_dist, (t0, t1), center_x = instance._pinch_start
+        x0, x1 = instance._pinch.values()
+        dist = abs(x1 - x0)
+        if not start_dist or not dist:
+            return
+        center = t0 + (center_x - instance.x) / instance.width * (t1 - t0)
+        rel = (center - t0) / (t1 - t0)
+        span = (t1 - t0) * start_dist / dist
+        self.zoom(center - rel * span, center - rel * span + span)
+
+    def _move_playhead(self, x):
+        """Move a barra de posição e o rótulo de tempo para `x` segundos."""
+        self.figure_widget.position_line.set_xdata([x, x])
+        self.figure_widget.position_annotation.set_position((x, 1.02))
+        self.figure_widget.position_annotation.set_text(f"{x:.3f} s")
+        self._redraw_playhead()
+
+    def _on_spectrogram_tiles(self):
+        """Na thread da UI: desenha os tiles do espectrograma que acabaram de ficar prontos."""
+        if self.figure_widget and self.figure_widget.waveform_data:
+            self.audio_controller.draw_spectrogram()
+            self._invalidate_background()
+
+    def _invalidate_background(self):
+        """Descarta o fundo em cache (conteúdo estático ou tamanho mudaram) e redesenha."""
+        if self.figure_widget:
+            self.figure_widget.playhead_background = None
+            Clock.schedule_once(lambda dt: self._redraw_playhead())
+
+    @profiling.traced("playhead_draw")
+    def _redraw_playhead(self):
+        """Redesenha a barra de posição.
+
+        No modo blit só a barra e o rótulo são desenhados sobre o fundo em cache;
+        caso contrário a figura inteira é renderizada de novo.
+        """
+        figure_widget = self.figure_widget
+        if not figure_widget or not figure_widget.waveform_data:
+            return
+        canvas = figure_widget.figure.canvas
+
+        if not self.blit_playhead:
+            with profiling.span("draw"):
+                try:
+                    canvas.draw_idle()
+                except:
+                    canvas.draw()
+                figure_widget._draw_bitmap()
+            return
+
+        if figure_widget.playhead_background is None:
+            with profiling.span("draw"):
+                canvas.draw()  # artistas animados ficam de fora
+            figure_widget.playhead_background = canvas.copy_from_bbox(figure_widget.figure.bbox)
+        canvas.restore_region(figure_widget.playhead_background)
+        ax = figure_widget.figure.axes[0]
+        ax.draw_artist(figure_widget.position_line)
+        ax.draw_artist(figure_widget.position_annotation)
+        canvas.blit(figure_widget.figure.bbox)
 
     def create_marker(self, time_position: float):
         """Cria um marcador visual no gráfico"""
         print(f"Criando marcador em {time_position:.3f} s")
         if not self.figure_widget or not self.figure_widget.waveform_data:
             return
-        ax = self.figure_widget.figure.axes[0]
-        ax.axvline(
-            x=time_position,
-            color="#5ff033",
-            linewidth=1.5,
-            linestyle='--',
-            zorder=9
-        )
-        self.markers_pos.append(time_position) if time_position not in self.markers_pos else None
-        self.figure_widget.figure.canvas.draw_idle()
+        store = self.audio_controller.marker_store(self.audio_selected)
+        if store.find(time_position, model.MANUAL) is not None:
+            return  # já existe um marcador manual nesse instante
 
-        print(f"Marcadores atuais: {self.markers_pos}")
-        
-        self.main_controller.table_controller.update_events(self.markers_pos, self.audio_selected)
-        self.main_controller.table_controller.add_row()
+        marker_id = store.add(time_position, model.MANUAL)
+        self.audio_controller.draw_markers()
+        self._invalidate_background()
+
+        print(f"Marcadores atuais: {len(store)}")
+        table = self.main_controller.table_controller
+        if table.store is store:  # a tabela pode estar mostrando a captura ao vivo
+            table.apply(inserted=[marker_id])
 
     def delete_marker(self):
-        """Remove um marcador visual do gráfico"""
-        if not self.figure_widget or not self.figure_widget.waveform_data:
+        """Remove os marcadores escolhidos na tabela, do store que ela exibe (arquivo ou captura ao vivo)."""
+        table = self.main_controller.table_controller
+        store = table.store
+        if store is None:
             return
-        markers_id = self.main_controller.table_controller.remove_selected()
-        ax = self.figure_widget.figure.axes[0]
-        for marker_time in sorted([self.markers_pos[i] for i in markers_id], reverse=True):
-            print(f"Removendo marcador em {marker_time:.3f} s")
-            # Remove a linha do marcador
-            for line in ax.get_lines():
-                if line.get_xdata()[0] == marker_time and line.get_linestyle() == '--':
-                    line.remove()
-                    break
-            # Remove da lista de marcadores
-            self.markers_pos.remove(marker_time)
-        self.figure_widget.figure.canvas.draw_idle()
-        self.main_controller.table_controller.update_table()
-        
+        markers_id = table.remove_selected()
+        for marker_id in markers_id:
+            print(f"Removendo marcador em {store.time_of[marker_id]:.3f} s")
+            store.remove(marker_id)
+        if store is self.audio_controller.markers.get(self.audio_selected) and self.figure_widget is not None:
+            self.audio_controller.draw_markers()
+            self._invalidate_background()
+        table.apply(deleted=markers_id)
+
 class MainController(BoxLayout):
     """Controlador principal que faz a ponte entre Model e View."""
     audio_files = ListProperty([])
@@ -406,8 +608,321 @@ class MainController(BoxLayout):
         self.audio_controller = model.AudioFilesModel()
         self.canvas_controller = CanvasController(self)
         self.table_controller = TableController(self)
+        self.live = None  # LiveDetector da captura do microfone em andamento
+        self.live_store = None  # MarkerStore da última captura ao vivo (fora de audio_controller.markers, que é por arquivo)
+        self.export_mode = "around"  # padrão de Download Audio/Joined; "between" (entre pares de marcadores) tem item próprio no menu
+        self.export_pre_roll = 0.5  # s antes de cada trecho exportado
+        self.export_post_roll = 0.5  # s depois de cada trecho exportado
+        self.exporter = None  # SegmentExporter em andamento
 
         self.bind(audio_files=self.update_audio_list)
+        self.audio_controller.engine.on_position = self._on_playback_position
+        self.audio_controller.engine.on_finished = self._on_playback_finished
+
+    # ---------------------------
+    # LIVE CAPTURE
+    # ---------------------------
+
+    def toggle_live_capture(self):
+        """Inicia ou para a detecção ao vivo do microfone; os eventos vão para a tabela."""
+        if self.live is not None and self.live.running:
+            self.live.stop()
+            print(f"Captura encerrada ({self.live.captured_seconds:.1f}s, {self.live.overruns} fatias descartadas).")
+            return
+
+        store = model.MarkerStore()
+        store.detected = True
+        live = LiveDetector()
+        live.on_event = lambda t, amp, wall: Clock.schedule_once(
+            lambda dt: self._on_live_event(store, t, wall)
+        )
+        try:
+            live.start()
+        except Exception as e:
+            print(f"Erro ao abrir o microfone: {e}")
+            return
+
+        # Só com o microfone aberto a captura ganha um store e passa a ocupar a tabela
+        self.live = live
+        self.live_store = store
+        self.table_controller.show(store, "Microfone")
+        print("Captura do microfone iniciada.")
+
+    def toggle_live_events(self):
+        """Alterna a tabela entre os eventos da captura ao vivo e os marcadores do arquivo selecionado."""
+        if self.live_store is None:
+            print("Nenhuma captura ao vivo.")
+            return
+        if self.table_controller.store is not self.live_store:
+            self.table_controller.show(self.live_store, "Microfone")
+        elif self.audio_selected:
+            self.table_controller.show(self.audio_controller.marker_store(self.audio_selected), self.audio_selected)
+
+    def _on_live_event(self, store, time_position, wall_time):
+        """Na thread da UI: registra um evento detectado ao vivo."""
+        marker_id = store.add(time_position, model.AUTO)
+        store.info[marker_id] = {
+            "title": f"Event at {time_position:.3f}s",
+            "description": f"Detected live at {time.strftime('%H:%M:%S', time.localtime(wall_time))}",
+        }
+        if self.table_controller.store is store:
+            self.table_controller.apply(inserted=[marker_id])
+
+    # ---------------------------
+    # EXPORT
+    # ---------------------------
+
+    def export_events(self, concatenate=False, mode=None):
+        """Exporta o áudio dos eventos do arquivo atual: um arquivo por trecho ou todos num arquivo só.
+
+        `mode` ("around" ou "between", padrão `export_mode`) define os trechos. O formato vem
+        da extensão escolhida no diálogo; no modo de arquivos separados, o nome escolhido
+        vira o prefixo dos trechos.
+        """
+        if self.exporter is not None:
+            print("Exportação já em andamento.")
+            return
+        store = self.audio_controller.markers.get(self.audio_selected)
+        if not self.audio_selected or store is None or len(store) == 0:
+            print("Nenhum evento para exportar.")
+            return
+
+        mode = mode or self.export_mode
+        name = Path(self.audio_selected).stem
+        initialfile = f"{name}_events.wav" if concatenate else f"{name}.wav"
+        browse_save_file(lambda path: self._start_export(path, store.times().tolist(), concatenate, mode), initialfile)
+
+    def _start_export(self, path, times, concatenate, mode="around"):
+        """Monta os trechos e grava em background (pool de threads do SegmentExporter)."""
+        try:
+            exporter = SegmentExporter(self.audio_selected)
+            clip_list = clips_between if mode == "between" else clips_around
+            clips = clip_list(times, exporter.duration, self.export_pre_roll, self.export_post_roll)
+        except Exception as e:
+            print(f"Erro ao preparar a exportação: {e}")
+            return
+        if not clips:
+            print("Nenhum trecho para exportar.")
+            return
+        self.exporter = exporter
+
+        def run():
+            start = time.perf_counter()
+            try:
+                if concatenate:
+                    saved = [exporter.export_concatenated(clips, path)]
+                else:
+                    out_dir, filename = os.path.split(path)
+                    prefix, ext = os.path.splitext(filename)
+                    saved = exporter.export_clips(clips, out_dir, prefix, ext or ".wav")
+                saved = [p for p in saved if p]
+                message = f"{len(saved)} arquivo(s) salvos em {os.path.dirname(path)} ({time.perf_counter() - start:.1f}s)."
+            except Exception as e:
+                message = f"Erro ao exportar: {e}"
+            print(message)
+            Clock.schedule_once(lambda dt: self._on_export_done(message))
+
+        threading.Thread(target=run, name="apelog-export-main", daemon=True).start()
+        print(f"Exportando {len(clips)} trecho(s)...")
+
+    def _on_export_done(self, message):
+        """Na thread da UI: libera o exportador e avisa o usuário."""
+        from kivymd.uix.dialog import MDDialog
+        from kivymd.uix.button import MDFlatButton
+
+        self.exporter = None
+        self.dialog = MDDialog(
+            title="Exportação",
+            text=message,
+            buttons=[MDFlatButton(text="OK", on_release=lambda x: self.dialog.dismiss())],
+        )
+        self.dialog.open()
+
+    def open_export_dialog(self):
+        """File → Download Settings: margens antes/depois de cada trecho exportado."""
+        from kivymd.uix.dialog import MDDialog
+        from kivymd.uix.button import MDFlatButton
+        from kivymd.uix.boxlayout import MDBoxLayout
+        from kivymd.uix.label import MDLabel
+        from kivymd.uix.textfield import MDTextField
+
+        content = MDBoxLayout(orientation="vertical", spacing=10, adaptive_height=True)
+        pre_field = MDTextField(text=f"{self.export_pre_roll:g}", hint_text="Pre-roll (s)")
+        post_field = MDTextField(text=f"{self.export_post_roll:g}", hint_text="Post-roll (s)")
+        status = MDLabel(
+            text="Aplicadas em torno de cada evento, ou às bordas de cada par de marcadores.",
+            theme_text_color="Hint", adaptive_height=True,
+        )
+        content.add_widget(pre_field)
+        content.add_widget(post_field)
+        content.add_widget(status)
+
+        def save(*args):
+            try:
+                pre_roll, post_roll = float(pre_field.text), float(post_field.text)
+                if pre_roll < 0 or post_roll < 0:
+                    raise ValueError("as margens não podem ser negativas")
+            except ValueError as e:
+                status.text = f"Erro: {e}"
+                return
+            self.export_pre_roll, self.export_post_roll = pre_roll, post_roll
+            print(f"Exportação: pre-roll {pre_roll:g}s, post-roll {post_roll:g}s.")
+            self.dialog.dismiss()
+
+        self.dialog = MDDialog(
+            title="Exportação",
+            type="custom",
+            content_cls=content,
+            buttons=[
+                MDFlatButton(text="Cancelar", on_release=lambda x: self.dialog.dismiss()),
+                MDFlatButton(text="Salvar", on_release=save),
+            ],
+        )
+        self.dialog.open()
+
+    # ---------------------------
+    # DETECTORS
+    # ---------------------------
+
+    def open_detector_dialog(self):
+        """Tools → Auto Marker: escolhe os detectores da cadeia (na ordem da lista) e seus parâmetros.
+
+        Mostra também o tempo de cada detector na última detecção.
+        """
+        from kivy.metrics import dp
+        from kivymd.uix.dialog import MDDialog
+        from kivymd.uix.button import MDFlatButton
+        from kivymd.uix.boxlayout import MDBoxLayout
+        from kivymd.uix.label import MDLabel
+        from kivymd.uix.selectioncontrol import MDCheckbox
+        from kivymd.uix.textfield import MDTextField
+
+        audio = self.audio_controller
+        chosen = dict(audio.detectors) if audio.audio_analysis else {}
+        timings = audio.detector_timings
+
+        content = MDBoxLayout(orientation="vertical", spacing=dp(4), adaptive_height=True)
+        rows = []
+        for name, detector in DETECTORS.items():
+            row = MDBoxLayout(orientation="horizontal", spacing=dp(8), adaptive_height=True)
+            check = MDCheckbox(active=name in chosen, size_hint=(None, None), size=(dp(36), dp(36)))
+            label = detector.label
+            if name in timings:
+                label += f" ({timings[name] * 1e3:.1f} ms)"
+            field = MDTextField(
+                text=format_params({**detector.defaults, **chosen.get(name, {})}),
+                hint_text="parâmetros", size_hint_x=0.6,
+            )
+            row.add_widget(check)
+            row.add_widget(MDLabel(text=label, size_hint_x=0.4))
+            row.add_widget(field)
+            content.add_widget(row)
+            rows.append((name, check, field))
+        status = MDLabel(
+            text="O 1º marcado gera eventos; os seguintes filtram.", theme_text_color="Hint", adaptive_height=True
+        )
+        content.add_widget(status)
+
+        def apply(*args):
+            try:
+                chain = [(name, parse_params(field.text)) for name, check, field in rows if check.active]
+                validate_chain(chain)
+            except ValueError as e:
+                status.text = f"Erro: {e}"
+                return
+            self.dialog.dismiss()
+            self._set_detectors(chain)
+
+        def disable(*args):
+            self.dialog.dismiss()
+            self._set_detectors(None)
+
+        self.dialog = MDDialog(
+            title="Detectores",
+            type="custom",
+            content_cls=content,
+            buttons=[
+                MDFlatButton(text="Desativar", on_release=disable),
+                MDFlatButton(text="Cancelar", on_release=lambda x: self.dialog.dismiss()),
+                MDFlatButton(text="Aplicar", on_release=apply),
+            ],
+        )
+        self.dialog.open()
+
+    def _set_detectors(self, chain):
+        """Troca a cadeia de detectores (None desliga a análise) e refaz os marcadores automáticos."""
+        audio = self.audio_controller
+        audio.audio_analysis = chain is not None
+        if chain is not None:
+            audio.detectors = chain
+            print("Cadeia de detectores: " + " → ".join(name for name, _ in chain))
+        else:
+            print("Análise automática desativada.")
+
+        # Marcadores automáticos antigos vieram de outra cadeia: saem, e cada arquivo é analisado de novo ao abrir
+        audio.cache.clear_markers()
+        for store in audio.markers.values():
+            store.remove_kind(model.AUTO)
+            store.detected = False
+        if self.audio_selected:
+            self.canvas_controller.draw_waveform()
+
+    # ---------------------------
+    # SPECTROGRAM
+    # ---------------------------
+
+    def toggle_spectrogram(self):
+        """Liga ou desliga a lane do espectrograma abaixo da waveform."""
+        audio = self.audio_controller
+        audio.show_spectrogram = not audio.show_spectrogram
+        audio.reset_waveform_fig()  # a figura muda de layout (1 ou 2 eixos)
+        print(f"Espectrograma {'ligado' if audio.show_spectrogram else 'desligado'}.")
+        if self.audio_selected:
+            self.canvas_controller.draw_waveform()
+
+    # ---------------------------
+    # CHANNEL MODE
+    # ---------------------------
+
+    def toggle_channel_mode(self):
+        """Alterna a análise de áudio multicanal entre o downmix e cada canal separado."""
+        from kivymd.uix.dialog import MDDialog
+        from kivymd.uix.button import MDFlatButton
+
+        audio = self.audio_controller
+        audio.channel_mode = "channels" if audio.channel_mode == "downmix" else "downmix"
+        audio.cache.clear_markers()  # marcadores em cache foram calculados no outro modo
+
+        if audio.channel_mode == "channels":
+            text = "Cada canal será analisado separadamente.\nVale para os próximos áudios analisados."
+        else:
+            text = "Os canais serão somados (downmix) antes da análise.\nVale para os próximos áudios analisados."
+        self.dialog = MDDialog(
+            title="Modo de Canais",
+            text=text,
+            buttons=[MDFlatButton(text="OK", on_release=lambda x: self.dialog.dismiss())],
+        )
+        self.dialog.open()
+
+    def _on_playback_position(self, time_position):
+        """Chamado pela thread de áudio: repassa a posição de reprodução para a thread da UI."""
+        Clock.schedule_once(lambda dt: self._update_playhead(time_position))
+
+    def _on_playback_finished(self):
+        """Chamado pela thread de áudio no fim do buffer: estado e UI mudam na thread da UI."""
+        Clock.schedule_once(lambda dt: self._finish_playback())
+
+    def _finish_playback(self):
+        self.audio_controller.finish_playback()
+        if not self.audio_controller.is_playing:  # senão uma nova reprodução já move a barra
+            self._update_playhead(0.0)
+
+    def _update_playhead(self, time_position):
+        """Move a barra de posição; ao fim do áudio, volta o botão para 'play'."""
+        if not self.audio_controller.is_playing:
+            self.ids.play_btn.icon = "play"
+            time_position = self.audio_controller.current_time
+        self.canvas_controller.update_position(time_position)
 
     # ---------------------------
     # VIEW CALLBACKS
@@ -424,6 +939,8 @@ class MainController(BoxLayout):
 
     def open_file_menu(self):
         """Abre o menu File"""
+        from kivymd.uix.menu import MDDropdownMenu
+
         menu_items = [
             {
                 "viewclass": "OneLineIconListItem",
@@ -435,6 +952,21 @@ class MainController(BoxLayout):
                 "text": "Download Audio",
                 "on_release": lambda x="download": self.on_menu_item_selected(x),
             },
+            {
+                "viewclass": "OneLineIconListItem",
+                "text": "Download Joined Audio",
+                "on_release": lambda x="download_joined": self.on_menu_item_selected(x),
+            },
+            {
+                "viewclass": "OneLineIconListItem",
+                "text": "Download Between Markers",
+                "on_release": lambda x="download_between": self.on_menu_item_selected(x),
+            },
+            {
+                "viewclass": "OneLineIconListItem",
+                "text": "Download Settings",
+                "on_release": lambda x="download_settings": self.on_menu_item_selected(x),
+            },
         ]
         
         self.file_menu = MDDropdownMenu(
@@ -446,12 +978,34 @@ class MainController(BoxLayout):
     
     def open_tools_menu(self):
         """Abre o menu Tools"""
+        from kivymd.uix.menu import MDDropdownMenu
+
         menu_items = [
             {
                 "viewclass": "OneLineIconListItem",
                 "text": "Auto Marker",
                 "on_release": lambda x="analysis": self.on_menu_item_selected(x),
             },
+            {
+                "viewclass": "OneLineIconListItem",
+                "text": "Live Capture",
+                "on_release": lambda x="live": self.on_menu_item_selected(x),
+            },
+            {
+                "viewclass": "OneLineIconListItem",
+                "text": "Live Events",
+                "on_release": lambda x="live_events": self.on_menu_item_selected(x),
+            },
+            {
+                "viewclass": "OneLineIconListItem",
+                "text": "Channel Mode",
+                "on_release": lambda x="channels": self.on_menu_item_selected(x),
+            },
+            {
+                "viewclass": "OneLineIconListItem",
+                "text": "Spectrogram",
+                "on_release": lambda x="spectrogram": self.on_menu_item_selected(x),
+            },
         ]
         
         self.tools_menu = MDDropdownMenu(
@@ -463,6 +1017,8 @@ class MainController(BoxLayout):
     
     def open_help_menu(self):
         """Abre o menu Help"""
+        from kivymd.uix.menu import MDDropdownMenu
+
         menu_items = [
             {
                 "viewclass": "OneLineIconListItem",
@@ -497,34 +1053,23 @@ class MainController(BoxLayout):
         if action == "upload":
             self.open_directory_selector()
         elif action == "download":
-            print("Download audio")
+            self.export_events()
+        elif action == "download_joined":
+            self.export_events(concatenate=True)
+        elif action == "download_between":
+            self.export_events(mode="between")
+        elif action == "download_settings":
+            self.open_export_dialog()
+        elif action == "live":
+            self.toggle_live_capture()
+        elif action == "live_events":
+            self.toggle_live_events()
+        elif action == "channels":
+            self.toggle_channel_mode()
+        elif action == "spectrogram":
+            self.toggle_spectrogram()
         elif action == "analysis":
-            if self.audio_controller.audio_analysis:
-                self.audio_controller.audio_analysis = False
-                self.dialog = MDDialog(
-                    title="Análise Automática Desativada",
-                    text="Análise automática do áudio foi desativada.\nMarcadores automáticos não serão mais gerados.",
-                    buttons=[
-                        MDFlatButton(
-                            text="OK",
-                            on_release=lambda x: self.dialog.dismiss()
-                        )
-                    ],
-                )
-                self.dialog.open()
-            else:
-                self.audio_controller.audio_analysis = True
-                self.dialog = MDDialog(
-                    title="Análise Automática Ativada",
-                    text="Análise automática do áudio foi ativada.\nMarcadores automáticos serão gerados ao carregar novos áudios.",
-                    buttons=[
-                        MDFlatButton(
-                            text="OK",
-                            on_release=lambda x: self.dialog.dismiss()
-                        )
-                    ],
-                )
-                self.dialog.open()
+            self.open_detector_dialog()
         elif action == "docs":
             print("Open documentation")
         elif action == "about":
@@ -551,6 +1096,7 @@ class MainController(BoxLayout):
             return
 
         self.canvas_controller.draw_waveform()
+        self.audio_controller.prefetcher.schedule(self.audio_files, filename)
 
     # ---------------------------
     # MEDIA BUTTONS
@@ -581,8 +1127,15 @@ class MainController(BoxLayout):
                 print("Nenhum áudio selecionado.")
                 return
             if self.ids.play_btn.icon == "play":
-                self.audio_controller.play(self.audio_selected)
                 self.ids.play_btn.icon = "pause"
+                if self.audio_controller.file_path == self.audio_selected and self.audio_controller.y is not None:
+                    self.audio_controller.play()
+                else:
+                    # Decodificação (ou espera do worker da waveform) fora da thread da UI
+                    threading.Thread(
+                        target=self._load_for_playback, args=(self.audio_selected,), daemon=True,
+                        name="apelog-play-load",
+                    ).start()
             else:
                 self.audio_controller.pause()
                 self.canvas_controller.update_position(self.audio_controller.current_time)
@@ -592,6 +1145,25 @@ class MainController(BoxLayout):
             self.ids.play_btn.icon = "play"
             return
     
+    def _load_for_playback(self, file_path):
+        """Roda numa thread: busca o áudio (cache, pré-carregamento ou decodificação) e agenda o play."""
+        try:
+            entry = self.audio_controller._fetch_entry(file_path)
+        except Exception as e:
+            print(f"Erro ao carregar áudio: {e}")
+            entry = None
+        Clock.schedule_once(lambda dt: self._start_playback(file_path, entry))
+
+    def _start_playback(self, file_path, entry):
+        """De volta na thread da UI: toca se o arquivo ainda for o selecionado e o play não foi desfeito."""
+        if file_path != self.audio_selected or self.ids.play_btn.icon != "pause":
+            return
+        if entry is None:
+            self.ids.play_btn.icon = "play"
+            return
+        self.audio_controller._use_entry(file_path, entry)
+        self.audio_controller.play()
+
     def on_next_button_pressed(self):
         """Chamado quando o usuário clica em 'next'"""
         try:
@@ -624,8 +1196,8 @@ class MainController(BoxLayout):
     def on_minus_button_pressed(self):
         """Chamado quando o usuário clica em 'minus' para remover marcadores"""
         try:
-            if not self.audio_selected:
-                print("Nenhum áudio selecionado.")
+            if self.table_controller.store is None:
+                print("Nenhum evento na tabela.")
                 return
             self.canvas_controller.delete_marker()
         except Exception as e:
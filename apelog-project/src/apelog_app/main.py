@@ -1,6 +1,22 @@
+import time
+_STARTUP = time.perf_counter()
+
+from kivy.utils import platform
+from kivy.config import Config
+
+# avoid conflict between mouse provider and touch (very important with touch device)
+# no need for android platform
+if platform != 'android':
+    Config.set('input', 'mouse', 'mouse,disable_on_activity')
+else:
+    #for android, we remove mouse input to not get extra touch 
+    Config.remove_option('input', 'mouse')
+
 from kivy.core.window import Window
 Window.maximize()
 
+from kivy.clock import Clock
+
 from kivymd.app import MDApp
 from kivy.lang import Builder
 
@@ -8,6 +24,9 @@ from pathlib import Path
 import setproctitle
 
 from apelog_app.controller.main_controller import MainController
+from apelog_app import profiling
+
+IMPORT_TIME = time.perf_counter() - _STARTUP  # imports + criação da janela
 
 class MyApp(MDApp):
     def build(self):
@@ -23,6 +42,25 @@ class MyApp(MDApp):
         Builder.load_file(str(kv_path))
         return MainController()
 
+    def on_start(self):
+        # Mede até o primeiro frame: regressões de startup aparecem no log
+        Clock.schedule_once(self._report_startup, 0)
+
+    def _report_startup(self, dt):
+        print(f"Startup: imports {IMPORT_TIME:.2f}s, primeira janela {time.perf_counter() - _STARTUP:.2f}s")
+
+    def on_stop(self):
+        self.root.audio_controller.prefetcher.shutdown()
+        self.root.audio_controller.spectrogram.shutdown()
+        self.root.audio_controller.engine.close()
+        if self.root.live is not None:
+            self.root.live.stop()
+        if self.root.exporter is not None:
+            self.root.exporter.cancel()
+        if profiling.TRACE_PATH:
+            print(profiling.report())
+            print(f"Trace salvo em {profiling.export_chrome_trace(profiling.TRACE_PATH)}")
+
 def main():
     MyApp().run()
 
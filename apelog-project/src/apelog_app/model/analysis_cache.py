@@ -0,0 +1,238 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from apelog_app.model.peaks import PeakPyramid, PeakLevel
+from apelog_app.model.stats import RunningStats
+from apelog_app import profiling
+
+CACHE_VERSION = 2  # mudar quando o formato ou os algoritmos mudarem: invalida tudo o que está em disco
+FINGERPRINT_CHUNK = 64 * 1024  # bytes lidos em cada um dos pontos amostrados do arquivo
+
+def default_cache_dir():
+    """APELOG_CACHE_DIR, senão $XDG_CACHE_HOME/apelog, senão ~/.cache/apelog."""
+    if os.environ.get("APELOG_CACHE_DIR"):
+        return Path(os.environ["APELOG_CACHE_DIR"])
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "apelog"
+
+def params_hash(params):
+    """Hash curto e estável de um dict de parâmetros serializável em JSON."""
+    text = json.dumps({"version": CACHE_VERSION, **params}, sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+# ---------------------------
+# ANALYSIS CACHE
+# ---------------------------
+
+class AnalysisCache:
+    """Cache persistente (em disco) dos resultados de análise: pirâmide de picos, estatísticas e marcadores.
+
+    Cada arquivo é identificado por uma impressão digital (tamanho + mtime + hash de
+    trechos do início, meio e fim): renomear ou mover preserva o mtime e não invalida;
+    qualquer gravação no arquivo muda o mtime e invalida, mesmo fora dos trechos.
+    Resumos são chaveados por impressão + parâmetros de resumo; marcadores por
+    impressão + hash dos parâmetros de detecção. Cada entrada é um .npz escrito de
+    forma atômica; acima de `max_bytes` as entradas menos usadas (mtime, atualizado
+    a cada leitura) são removidas. Erros de disco nunca interrompem a análise.
+    """
+
+    def __init__(self, directory=None, max_bytes=1024 ** 3):
+        self.directory = Path(directory) if directory else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._fingerprints = {}  # {(caminho, mtime_ns, tamanho): impressão}
+        self._nbytes = None  # estimativa do tamanho do diretório; None = ainda não medido
+        self._lock = threading.Lock()
+
+    # ---------------------------
+    # KEYS
+    # ---------------------------
+
+    def fingerprint(self, file_path):
+        """Impressão digital do arquivo (memorizada por caminho + mtime + tamanho).
+
+        Os trechos amostrados não enxergam edições no meio do arquivo que mantêm o
+        tamanho (ex.: ganho num trecho de um WAV); o mtime entra no hash para isso.
+        """
+        st = os.stat(file_path)
+        key = (os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            fingerprint = self._fingerprints.get(key)
+        if fingerprint is not None:
+            return fingerprint
+
+        digest = hashlib.blake2b(f"{st.st_size}:{st.st_mtime_ns}".encode(), digest_size=16)
+        with open(file_path, "rb") as f:
+            for offset in (0, max(0, st.st_size // 2 - FINGERPRINT_CHUNK // 2), max(0, st.st_size - FINGERPRINT_CHUNK)):
+                f.seek(offset)
+                digest.update(f.read(FINGERPRINT_CHUNK))
+        fingerprint = digest.hexdigest()
+        with self._lock:
+            self._fingerprints[key] = fingerprint
+        return fingerprint
+
+    # ---------------------------
+    # SUMMARIES / MARKERS
+    # ---------------------------
+
+    def load_summaries(self, file_path, params):
+        """(PeakPyramid, RunningStats) guardados para o arquivo e os parâmetros de resumo, ou None."""
+        data = self._read(file_path, "summary", params)
+        if data is None:
+            return None
+        try:
+            peaks = PeakPyramid(sr=int(data["sr"]), base_block=int(data["base_block"]), factor=int(data["factor"]),
+                                min_bins=int(data["min_bins"]))
+            peaks.n_samples = int(data["n_samples"])
+            peaks.levels = [
+                PeakLevel(int(block), data[f"mins{i}"], data[f"maxs{i}"], data[f"sumsq{i}"])
+                for i, block in enumerate(data["blocks"])
+            ]
+            stats = RunningStats()
+            stats.count, stats.mean, stats.m2, stats.peak = data["stats"].tolist()
+            stats.count = int(stats.count)
+            return peaks, stats
+        except Exception as e:
+            print(f"Cache de análise inválido para {os.path.basename(file_path)}: {e}")
+            return None
+
+    def save_summaries(self, file_path, params, peaks, stats):
+        arrays = {
+            "sr": peaks.sr, "n_samples": peaks.n_samples, "base_block": peaks.base_block,
+            "factor": peaks.factor, "min_bins": peaks.min_bins,
+            "blocks": np.array([level.block for level in peaks.levels], dtype=np.int64),
+            "stats": np.array([stats.count, stats.mean, stats.m2, stats.peak], dtype=np.float64),
+        }
+        for i, level in enumerate(peaks.levels):
+            arrays[f"mins{i}"], arrays[f"maxs{i}"], arrays[f"sumsq{i}"] = level.mins, level.maxs, level.sumsq
+        self._write(file_path, "summary", params, arrays)
+
+    def load_markers(self, file_path, params):
+        """Marcadores [(tempo, amplitude), ...] guardados para o arquivo e os parâmetros de detecção, ou None."""
+        data = self._read(file_path, "markers", params)
+        if data is None:
+            return None
+        return list(zip(data["times"].tolist(), data["amps"].tolist()))
+
+    def save_markers(self, file_path, params, points):
+        self._write(file_path, "markers", params, {
+            "times": np.array([t for t, _ in points], dtype=np.float64),
+            "amps": np.array([amp for _, amp in points], dtype=np.float64),
+        })
+
+    # ---------------------------
+    # STORAGE
+    # ---------------------------
+
+    def _path(self, file_path, kind, params):
+        return self.directory / f"{self.fingerprint(file_path)}-{params_hash(params)}.{kind}.npz"
+
+    @property
+    def nbytes(self):
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        """(mtime, caminho, tamanho) de cada entrada em disco."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if item.name.endswith(".npz"):
+                        try:
+                            st = item.stat()
+                        except FileNotFoundError:
+                            continue  # removido por outro processo
+                        entries.append((st.st_mtime, item.path, st.st_size))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _read(self, file_path, kind, params):
+        """Arrays da entrada (dict), ou None se ela não existir ou não puder ser lida."""
+        try:
+            path = self._path(file_path, kind, params)
+            with np.load(path, allow_pickle=False) as npz:
+                data = {name: npz[name] for name in npz.files}
+            os.utime(path)  # marca como recém-usada para a evicção
+        except FileNotFoundError:
+            data = None
+        except Exception as e:
+            print(f"Erro ao ler o cache de análise ({os.path.basename(file_path)}): {e}")
+            data = None
+
+        if data is None:
+            self.misses += 1
+            profiling.count(f"disk_cache.{kind}.miss")
+        else:
+            self.hits += 1
+            profiling.count(f"disk_cache.{kind}.hit")
+        return data
+
+    def _write(self, file_path, kind, params, arrays):
+        """Grava num arquivo temporário e renomeia (leitores concorrentes nunca veem um .npz pela metade)."""
+        tmp = None
+        try:
+            path = self._path(file_path, kind, params)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+            size = path.stat().st_size
+        except Exception as e:
+            print(f"Erro ao gravar o cache de análise ({os.path.basename(file_path)}): {e}")
+            if tmp is not None and tmp.exists():
+                tmp.unlink()
+            return
+
+        with self._lock:
+            if self._nbytes is None:
+                self._nbytes = self.nbytes
+            else:
+                self._nbytes += size  # sobrescritas contam em dobro: só antecipa a próxima varredura
+            over = self._nbytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _evict(self):
+        """Remove as entradas menos usadas até o diretório caber em `max_bytes`.
+
+        O diretório só é varrido quando a estimativa passa do limite, e outros
+        processos (batch em paralelo) podem estar removendo as mesmas entradas.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        removed = 0
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._nbytes = total
+        if removed:
+            profiling.count("disk_cache.evicted", removed)
+
+    def clear(self):
+        """Apaga todas as entradas do cache em disco."""
+        for _, path, _ in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._nbytes = 0
@@ -0,0 +1,472 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import copy
+import os
+import threading
+
+import numpy as np
+import soundfile as sf
+
+from apelog_app.model.peaks import PeakPyramid
+from apelog_app.model.stats import RunningStats, WindowedStats
+from apelog_app.model.pcm import DownmixView, column, open_wav_memmap
+from apelog_app.model.cache import AudioCache, CacheEntry
+from apelog_app.model.detectors import run_chain
+from apelog_app import profiling
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".ogg")
+
+# ---------------------------
+# AUDIO MODEL
+# ---------------------------
+
+class MediaModel:
+    def __init__(self):
+        self.y = None
+        self.sr = None
+        self.duration = 0.0
+        self.file_path = None
+        self.entry = None  # CacheEntry do arquivo carregado
+        self.peaks = None  # PeakPyramid do arquivo carregado (streaming ou _ensure_summaries)
+        self.stats = None  # RunningStats do arquivo carregado (streaming ou _ensure_summaries)
+        self.cache = AudioCache(max_bytes=512 * 1024 ** 2)  # áudios decodificados + dados derivados (LRU)
+        self.disk_cache = None  # AnalysisCache: resumos e marcadores persistidos entre sessões (opcional)
+        self.prefetcher = None  # Prefetcher que alimenta o cache em background (opcional)
+        self._decoding = {}  # {caminho: threading.Event} decodificações em andamento fora do Prefetcher
+        self._decoding_lock = threading.Lock()
+        self.streaming_load = True  # decodifica em blocos em vez de um único sf.read
+        self.memory_map = True  # mapeia .wav PCM/float direto do disco, sem decodificar
+        self.load_blocksize = 65536  # frames por bloco no modo streaming
+        self.scan_blocksize = 1 << 18  # amostras por bloco nas varreduras e lotes da detecção (limita a memória de pico)
+        self.dtype = 'float32'  # armazenamento de ponta a ponta: metade da memória de float64, precisão de sobra para áudio
+        self.channel_mode = "downmix"  # multicanal: "downmix" (média dos canais) ou "channels" (cada canal analisado)
+        self.merge_gap = 0.05  # s; no modo "channels", detecções simultâneas em canais diferentes viram um marcador
+        self.threshold_mode = "global"  # "global": std do arquivo inteiro; "windowed": piso de ruído recente
+        self.noise_window = 30.0  # segundos de sinal considerados no modo "windowed"
+        self.detectors = [("slice_peak", {})]  # cadeia [(nome, parâmetros)] de model.detectors.DETECTORS
+        self.detector_timings = {}  # {nome: s} da última detecção (dict compartilhado pelas cópias rasas)
+        self.pitch_freq_range = None  # (fmin, fmax) em Hz para a autocorrelação; None = lags 150–250
+
+    def _librosa_load(self, file_path):
+        """Carrega o arquivo de áudio usando librosa."""
+        try:
+            self._use_entry(file_path, self._fetch_entry(file_path))
+            return True
+        except Exception as e:
+            print(f"Erro ao carregar áudio: {e}")
+            return False
+
+    def _fetch_entry(self, file_path, cancelled=None):
+        """Retorna o CacheEntry do arquivo: do cache, de um pré-carregamento em andamento ou decodificando agora."""
+        entry = self.cache.get(file_path) if self.cache is not None else None
+        if entry is None and self.prefetcher is not None:
+            self.prefetcher.wait(file_path)  # já pode estar sendo decodificado em background
+            entry = self.cache.get(file_path)
+        if entry is None and self.cache is not None:
+            entry = self._wait_decoding(file_path)  # ex.: Play enquanto o worker da waveform decodifica
+        if entry is not None:
+            profiling.count("cache.hit")
+            return entry
+
+        profiling.count("cache.miss")
+        path = os.path.abspath(file_path)
+        done = threading.Event()
+        with self._decoding_lock:
+            self._decoding.setdefault(path, done)
+        try:
+            entry = self._decode(file_path, cancelled)
+            if entry is not None and self.cache is not None:
+                self.cache.put(file_path, entry)
+        finally:
+            with self._decoding_lock:
+                if self._decoding.get(path) is done:
+                    del self._decoding[path]
+            done.set()
+        return entry
+
+    def _wait_decoding(self, file_path):
+        """Se outra thread está decodificando `file_path`, espera e retorna a entrada que ela pôs no cache."""
+        with self._decoding_lock:
+            done = self._decoding.get(os.path.abspath(file_path))
+        if done is None:
+            return None
+        done.wait()
+        return self.cache.get(file_path)  # None se a outra decodificação foi cancelada ou falhou
+
+    def _use_entry(self, file_path, entry):
+        """Torna `entry` o áudio atual do modelo."""
+        self.file_path = file_path
+        self.entry = entry
+        self.y, self.sr = entry.y, entry.sr
+        self.peaks, self.stats = entry.peaks, entry.stats
+        self.duration = len(self.y) / self.sr
+
+    @profiling.traced("decode")
+    def _decode(self, file_path, cancelled=None):
+        """Decodifica (ou mapeia) o arquivo e retorna um CacheEntry, sem alterar o estado do modelo.
+
+        `cancelled` (threading.Event opcional) interrompe a decodificação em streaming; nesse caso retorna None.
+        """
+        mapped = None
+        if self.memory_map and file_path.lower().endswith(".wav"):
+            mapped = open_wav_memmap(file_path, self.dtype)
+        summaries = self._load_summaries(file_path)  # (peaks, stats) do cache em disco, ou None
+
+        if mapped is not None:
+            # Sem cache em disco, pirâmide e estatísticas ficam para _ensure_summaries(), sob demanda
+            return CacheEntry(*mapped, *(summaries or ()))
+        if not self.streaming_load:
+            return CacheEntry(*sf.read(file_path, dtype=self.dtype), *(summaries or ()))
+
+        entry = self._stream_decode(file_path, cancelled, summarize=summaries is None)
+        if entry is not None:
+            if summaries is None:
+                self._save_summaries(file_path, entry.peaks, entry.stats)
+            else:
+                entry.peaks, entry.stats = summaries
+        return entry
+
+    def _stream_decode(self, file_path, cancelled=None, summarize=True):
+        """Decodifica o arquivo bloco a bloco direto no buffer de reprodução.
+
+        Cada bloco lido alimenta também a pirâmide de picos e as estatísticas de
+        detecção, então nenhum dos dois precisa de uma nova passada sobre o sinal.
+        Com `summarize=False` (resumos já vindos do cache em disco) só decodifica.
+        """
+        with sf.SoundFile(file_path) as f:
+            shape = (f.frames,) if f.channels == 1 else (f.frames, f.channels)
+            y = np.empty(shape, dtype=self.dtype)
+            peaks = PeakPyramid(sr=f.samplerate) if summarize else None
+            stats = RunningStats() if summarize else None
+
+            pos = 0
+            while pos < len(y):
+                if cancelled is not None and cancelled.is_set():
+                    return None
+                block = f.read(dtype=self.dtype, out=y[pos:pos + self.load_blocksize])
+                if len(block) == 0:  # cabeçalho informou mais frames do que existem
+                    break
+                if summarize:
+                    peaks.update(block)
+                    stats.update(block)
+                pos += len(block)
+            sr = f.samplerate
+
+        return CacheEntry(y[:pos], sr, peaks.finalize() if summarize else None, stats)
+
+    @profiling.traced("summarize")
+    def _summarize(self, y, sr):
+        """Calcula em blocos a pirâmide de picos e as estatísticas de um sinal já carregado."""
+        peaks = PeakPyramid(sr=sr)
+        stats = RunningStats()
+        for start in range(0, len(y), self.load_blocksize):
+            block = y[start:start + self.load_blocksize]
+            peaks.update(block)
+            stats.update(block)
+        return peaks.finalize(), stats
+
+    def _ensure_summaries(self):
+        """Garante pirâmide de picos e estatísticas do áudio atual quando o loader não as produziu."""
+        if self.peaks is not None and self.stats is not None:
+            return
+        self.peaks, self.stats = self._summarize(self.y, self.sr)
+        if self.file_path is not None:
+            self._save_summaries(self.file_path, self.peaks, self.stats)
+        if self.entry is not None:
+            self.entry.peaks, self.entry.stats = self.peaks, self.stats
+            if self.cache is not None:
+                self.cache.put(self.file_path, self.entry)  # reavalia o orçamento
+
+    # ---------------------------
+    # DISK CACHE
+    # ---------------------------
+
+    def _summary_params(self):
+        """Parâmetros que determinam a pirâmide e as estatísticas de um arquivo (parte da chave do cache em disco)."""
+        return {"kind": "summary", "dtype": str(np.dtype(self.dtype))}
+
+    def _marker_params(self, chain):
+        """Parâmetros que determinam os marcadores automáticos (parte da chave do cache em disco)."""
+        return {
+            "kind": "markers", "dtype": str(np.dtype(self.dtype)), "chain": chain,
+            "channel_mode": self.channel_mode, "merge_gap": self.merge_gap,
+            "threshold_mode": self.threshold_mode, "noise_window": self.noise_window,
+            "pitch_freq_range": self.pitch_freq_range,
+        }
+
+    def _load_summaries(self, file_path):
+        if self.disk_cache is None:
+            return None
+        return self.disk_cache.load_summaries(file_path, self._summary_params())
+
+    def _save_summaries(self, file_path, peaks, stats):
+        if self.disk_cache is not None and peaks is not None and stats is not None:
+            self.disk_cache.save_summaries(file_path, self._summary_params(), peaks, stats)
+
+    def _detector_chain(self, interval=5.0):
+        """`self.detectors` com `interval` como fatia do "slice_peak" quando a cadeia não define outra."""
+        return [
+            (name, {"interval": interval, **params} if name == "slice_peak" else params)
+            for name, params in self.detectors
+        ]
+
+    def cached_markers(self, file_path, interval=5.0):
+        """Marcadores automáticos de `file_path` guardados no cache em disco para a cadeia atual, ou None."""
+        if self.disk_cache is None:
+            return None
+        return self.disk_cache.load_markers(file_path, self._marker_params(self._detector_chain(interval)))
+
+    @property
+    def channels(self):
+        """Número de canais do áudio atual (sinais 1-D são mono)."""
+        if self.y is None:
+            return 0
+        return 1 if self.y.ndim == 1 else self.y.shape[1]
+
+    def _downmix(self):
+        """Média dos canais como sinal mono, calculada sob demanda trecho a trecho (nenhuma cópia do arquivo inteiro)."""
+        return DownmixView(self.y, self.dtype)
+
+    def _channel_signals(self):
+        """Sinais 1-D que a detecção analisa, conforme `channel_mode`."""
+        if self.channels == 1:
+            return [self.y]
+        if self.channel_mode == "channels":
+            return [column(self.y, c) for c in range(self.channels)]  # views: nenhum canal é copiado inteiro
+        return [self._downmix()]
+
+    def _signal_stats(self, y):
+        """RunningStats de um sinal 1-D derivado (canal ou downmix), em blocos."""
+        stats = RunningStats()
+        for start in range(0, len(y), self.load_blocksize):
+            stats.update(y[start:start + self.load_blocksize])
+        return stats
+
+    def timestamps(self, start_sample=0, end_sample=None):
+        """Instantes (s) das amostras [start_sample, end_sample), calculados sob demanda."""
+        if end_sample is None:
+            end_sample = len(self.y)
+        return np.arange(start_sample, end_sample) / self.sr
+
+    def waveform_envelope(self, n_pixels, t0=0.0, t1=None):
+        """Retorna (t, y, rms) do intervalo [t0, t1] prontos para desenhar em `n_pixels`.
+
+        Mínimos e máximos são intercalados numa única linha; quando o intervalo
+        tem menos amostras que o necessário, devolve as amostras brutas (rms=None).
+        """
+        self._ensure_summaries()
+        peaks = self.peaks.fetch(n_pixels, t0, t1)
+        if peaks is None:
+            s0 = max(0, int(t0 * self.sr))
+            s1 = len(self.y) if t1 is None else min(len(self.y), int(np.ceil(t1 * self.sr)) + 1)
+            return self.timestamps(s0, s1), self.y[s0:s1], None
+
+        t, mins, maxs, rms = peaks
+        y = np.stack([mins, maxs], axis=1).reshape((-1,) + mins.shape[1:])
+        return np.repeat(t, 2), y, rms
+
+    def segment(self, start, duration):
+        """Retorna um trecho do áudio em um intervalo de tempo específico."""
+        start_sample = int(start * self.sr)
+        end_sample = int((start + duration) * self.sr)
+        end_sample = min(end_sample, len(self.y))
+        
+        seg = type("Segment", (), {})()  # objeto dinâmico simples
+        seg.ys = self.y[start_sample:end_sample]
+        seg.ts = np.arange(len(seg.ys)) / self.sr + start
+        seg.framerate = self.sr
+        seg.duration = len(seg.ys) / self.sr
+        return seg
+
+    def _lag_bounds(self):
+        """Intervalo [lag_min, lag_max) de lags (em amostras) usado na busca da periodicidade."""
+        if self.pitch_freq_range is None:
+            return 150, 250
+        fmin, fmax = self.pitch_freq_range
+        return max(1, int(self.sr / fmax)), int(np.ceil(self.sr / fmin)) + 1
+
+    @profiling.traced("autocorrelate")
+    def _autocorrelate(self, windows, max_lag):
+        """Autocorrelação (lags 0..max_lag-1) de cada linha de um lote 2-D, via um único par rfft/irfft."""
+        nfft = 1 << (2 * windows.shape[1] - 2).bit_length()  # >= 2n-1: evita aliasing circular
+        spectrum = np.fft.rfft(windows, n=nfft, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        return np.fft.irfft(power, n=nfft, axis=1)[:, :max_lag]
+
+    @profiling.traced("fundamental_freq")
+    def _estimate_fundamental_freq(self, peaks_points, batch_size=256):
+        """Estima a frequência fundamental usando autocorrelação em segmentos ao redor dos picos locais.
+
+        As janelas de todos os picos são empilhadas (com zero-padding) em lotes 2-D de até
+        `batch_size` linhas e cada lote é resolvido com uma única FFT. Como cada linha gera
+        vários temporários de `nfft` amostras (espectro, potência, irfft), o lote também é
+        limitado a `scan_blocksize` amostras contando esses temporários.
+        """
+        frequencies = np.zeros(len(peaks_points))
+        if not peaks_points:
+            return []
+
+        lag_min, lag_max = self._lag_bounds()
+
+        # Extract a segment around the peak (0.2s before and 0.2s after), como em segment()
+        peak_times = np.array([peak[0] for peak in peaks_points], dtype=float)
+        start_times = np.maximum(0, peak_times - 0.2)
+        durations = np.where(start_times + 0.4 > self.duration, self.duration - start_times, 0.4)
+        starts = (start_times * self.sr).astype(np.int64)
+        ends = np.minimum(((start_times + durations) * self.sr).astype(np.int64), len(self.y))
+        lengths = np.maximum(ends - starts, 0)
+
+        valid = np.flatnonzero(lengths >= max(300, lag_max))  # janelas muito curtas ficam com 0
+        if len(valid):
+            nfft = 1 << (2 * int(lengths[valid].max()) - 2).bit_length()  # mesmo tamanho de _autocorrelate
+            batch_size = max(1, min(batch_size, self.scan_blocksize // (4 * nfft)))
+        for b in range(0, len(valid), batch_size):
+            rows = valid[b:b + batch_size]
+            windows = np.zeros((len(rows), lengths[rows].max()), dtype=self.y.dtype)
+            for j, i in enumerate(rows):
+                windows[j, :lengths[i]] = self.y[starts[i]:ends[i]]
+
+            # Find the maximum in a reasonable lag range
+            corrs = self._autocorrelate(windows, lag_max)
+            lags = np.argmax(corrs[:, lag_min:lag_max], axis=1) + lag_min
+            frequencies[rows] = 1 / (lags / self.sr)
+
+        return frequencies.tolist()
+
+    def _slice_bounds(self, interval):
+        """Limites [início, fim) em amostras de cada fatia de `interval` segundos, idênticos aos de `segment()`."""
+        num_slices = max(1, int(self.duration / interval))
+        start_times = np.arange(num_slices) * interval
+        durations = np.minimum(interval, self.duration - start_times)
+
+        starts = (start_times * self.sr).astype(np.int64)
+        ends = np.minimum(((start_times + durations) * self.sr).astype(np.int64), len(self.y))
+        return start_times, starts, ends
+
+    def _slice_peaks(self, starts, ends):
+        """Retorna (índice relativo, amplitude) do máximo de cada fatia.
+
+        As fatias regulares (mesmo tamanho, contíguas) são resolvidas em blocos de linhas de
+        uma view 2-D do sinal, cada bloco com até `scan_blocksize` amostras (num arquivo mapeado,
+        só o bloco é convertido para float); só as irregulares (ex.: última fatia menor) caem no
+        laço. Fatias vazias recebem amplitude -inf.
+        """
+        lengths = np.maximum(ends - starts, 0)
+        idx = np.zeros(len(starts), dtype=np.int64)
+        amps = np.full(len(starts), -np.inf)
+
+        width = int(lengths[0])
+        regular = (starts == np.arange(len(starts)) * width) & (lengths == width)
+        n_regular = len(starts) if regular.all() else int(np.argmin(regular))
+
+        if n_regular and width:
+            rows = max(1, self.scan_blocksize // width)
+            for r0 in range(0, n_regular, rows):
+                r1 = min(n_regular, r0 + rows)
+                block = self.y[r0 * width:r1 * width].reshape(r1 - r0, width)
+                idx[r0:r1] = np.argmax(block, axis=1)
+                amps[r0:r1] = block[np.arange(r1 - r0), idx[r0:r1]]
+
+        for i in range(n_regular, len(starts)):
+            if lengths[i] == 0:
+                continue
+            ys = self.y[starts[i]:ends[i]]
+            idx[i] = np.argmax(ys)
+            amps[i] = ys[idx[i]]
+
+        return idx, amps
+
+    def _amp_thresholds(self, starts, ends, noise_factor):
+        """Limiar de amplitude: um só para o arquivo (modo "global") ou um por fatia (modo "windowed").
+
+        No modo "global" o desvio padrão vem das estatísticas calculadas durante o
+        carregamento, idêntico a np.std do sinal inteiro. No "windowed" ele é o das
+        últimas `noise_window` s até o fim de cada fatia, calculado em streaming.
+        """
+        if self.threshold_mode == "windowed":
+            window = WindowedStats(self.noise_window * self.sr, block=self.sr)
+            thresholds = np.empty(len(starts))
+            for i in range(len(starts)):
+                window.update(self.y[starts[i]:ends[i]])
+                thresholds[i] = 0.05 + window.std * noise_factor
+            return thresholds
+
+        if self.stats is None:
+            self._ensure_summaries()
+        return 0.05 + (self.stats.std * noise_factor)
+
+    def _auto_generate_markers(self, interval=5.0):
+        """Gera marcadores automáticos com a cadeia de detectores `self.detectors`.
+
+        `interval` é a fatia do detector "slice_peak" quando a cadeia não define outra.
+        Com `disk_cache`, marcadores já calculados para este conteúdo e estes parâmetros
+        são lidos do disco em vez de detectados de novo.
+        """
+        if self.disk_cache is not None and self.file_path is not None:
+            points = self.cached_markers(self.file_path, interval)
+            if points is not None:
+                self.detector_timings.clear()  # nada foi medido nesta chamada
+                print(f"{len(points)} marcadores lidos do cache de análise.")
+                return points
+        return self._detect_markers(interval)
+
+    @profiling.traced("detect")
+    def _detect_markers(self, interval=5.0):
+        """Roda a cadeia de detectores sobre o áudio atual (sem consultar o cache em disco) e grava o resultado nele.
+
+        Áudio multicanal é analisado conforme `channel_mode`: o downmix como um sinal
+        mono, ou cada canal separadamente (marcadores de todos os canais, em ordem de tempo).
+        """
+        chain = self._detector_chain(interval)
+        timings = {}
+        if self.channels == 1:
+            points = run_chain(self, chain, timings)
+        else:
+            points = []
+            for signal in self._channel_signals():
+                # Cópia rasa do modelo apontando para o sinal 1-D (mesmo padrão de prepare_waveform)
+                view = copy.copy(self)
+                view.y, view.entry, view.peaks = signal, None, None
+                view.stats = self._signal_stats(signal) if self.threshold_mode == "global" else None
+                points.extend(run_chain(view, chain, timings))
+            points = self._merge_channel_points(points)
+
+        self.detector_timings.clear()
+        self.detector_timings.update(timings)
+        print("Detectores: " + ", ".join(f"{name} {t * 1e3:.1f} ms" for name, t in timings.items()))
+        profiling.count("markers.detected", len(points))
+        if self.disk_cache is not None and self.file_path is not None:
+            self.disk_cache.save_markers(self.file_path, self._marker_params(chain), points)
+        return points
+
+    def _merge_channel_points(self, points):
+        """Ordena por tempo e junta detecções a menos de `merge_gap` s, mantendo a de maior amplitude."""
+        merged = []
+        for point in sorted(points, key=lambda p: p[0]):
+            if merged and point[0] - merged[-1][0] < self.merge_gap:
+                if point[1] > merged[-1][1]:
+                    merged[-1] = point
+                continue
+            merged.append(point)
+        return merged
+
+    def _detect_signal(self, interval, noise_factor=15, freq_threshold=90):
+        """Critérios de detecção sobre `self.y` 1-D: máximo de cada fatia acima do limiar, filtrado pela frequência."""
+        # Máximo local de todas as fatias de uma vez
+        start_times, starts, ends = self._slice_bounds(interval)
+        amp_threshold = self._amp_thresholds(starts, ends, noise_factor)
+        idx, amps = self._slice_peaks(starts, ends)
+        times = idx / self.sr + start_times
+
+        above = amps > amp_threshold
+        local_maxima_points = list(zip(times[above], self.y[starts[above] + idx[above]]))
+
+        # Filter by fundamental frequency
+        frequencies = self._estimate_fundamental_freq(local_maxima_points)
+        filtered_points = [
+            point for i, point in enumerate(local_maxima_points)
+            if frequencies[i] >= freq_threshold
+        ]
+        return filtered_points
@@ -0,0 +1,124 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------------------
+# CACHE ENTRY
+# ---------------------------
+
+class CacheEntry:
+    """Áudio decodificado de um arquivo e os dados derivados dele."""
+    __slots__ = ("y", "sr", "peaks", "stats", "markers")
+
+    def __init__(self, y, sr, peaks=None, stats=None, markers=None):
+        self.y = y
+        self.sr = sr
+        self.peaks = peaks
+        self.stats = stats
+        self.markers = markers
+
+    @property
+    def nbytes(self):
+        """Memória residente estimada (bytes). Buffers mapeados do disco não contam."""
+        size = 0
+        if isinstance(self.y, np.ndarray) and not isinstance(self.y, np.memmap):
+            size += self.y.nbytes
+        if self.peaks is not None:
+            size += self.peaks.nbytes
+        return size
+
+# ---------------------------
+# LRU CACHE
+# ---------------------------
+
+class AudioCache:
+    """Cache LRU de áudios decodificados, chaveado por caminho + mtime, com orçamento em bytes e em entradas.
+
+    Um arquivo modificado no disco gera uma chave nova, e a entrada antiga é descartada.
+    Buffers mapeados do disco quase não ocupam memória, mas cada um mantém um descritor
+    de arquivo aberto (e, no Windows, o arquivo travado): `max_entries` limita quantos
+    ficam vivos, independentemente do orçamento em bytes.
+    Thread-safe, para ser compartilhado com os workers de pré-carregamento.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2, max_entries=64):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # {(path, mtime_ns, size): CacheEntry}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(file_path):
+        st = os.stat(file_path)
+        return (os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, file_path):
+        try:
+            key = self._key(file_path)
+        except OSError:
+            return False
+        with self._lock:
+            return key in self._entries
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def get(self, file_path):
+        """Retorna a entrada do arquivo (marcando como recém-usada) ou None."""
+        key = self._key(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, file_path, entry):
+        """Guarda (ou atualiza) a entrada do arquivo e aplica o orçamento de memória."""
+        key = self._key(file_path)
+        with self._lock:
+            for stale in [k for k in self._entries if k[0] == key[0] and k != key]:
+                del self._entries[stale]
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def discard(self, file_path=None):
+        """Remove um arquivo do cache, ou todos."""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                return
+            path = os.path.abspath(file_path)
+            for key in [k for k in self._entries if k[0] == path]:
+                del self._entries[key]
+
+    def clear_markers(self, file_path=None):
+        """Esquece os marcadores calculados de um arquivo, ou de todos, mantendo o áudio."""
+        path = os.path.abspath(file_path) if file_path else None
+        with self._lock:
+            for key, entry in self._entries.items():
+                if path is None or key[0] == path:
+                    entry.markers = None
+
+    def _evict(self):
+        """Remove as entradas menos usadas até caber nos orçamentos (a mais recente sempre fica)."""
+        total = sum(entry.nbytes for entry in self._entries.values())
+        while (total > self.max_bytes or len(self._entries) > self.max_entries) and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.nbytes
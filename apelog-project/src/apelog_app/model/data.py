@@ -3,182 +3,99 @@
 # ---------------------------
 
 import os
+import copy
+import logging
 
-import numpy as np
-import time
-import threading
-import soundfile as sf
-import sounddevice as sd
-
-import matplotlib
-matplotlib.use('module://kivy_garden.matplotlib.backend_kivy')
-import matplotlib.pyplot as plt
-
-from kivy.utils import platform
-from kivy.config import Config
-
-# avoid conflict between mouse provider and touch (very important with touch device)
-# no need for android platform
-if platform != 'android':
-    Config.set('input', 'mouse', 'mouse,disable_on_activity')
-else:
-    #for android, we remove mouse input to not get extra touch 
-    Config.remove_option('input', 'mouse')
 
-import logging
-logging.getLogger('matplotlib').setLevel(logging.WARNING) # Suprime warnings do matplotlib
-
-# Configurações globais do matplotlib para evitar score das fontes
-matplotlib.use("module://kivy_garden.matplotlib.backend_kivy")  # Usa o backend certo
-matplotlib.rcParams.update({
-    'font.family': 'DejaVu Sans',
-    'text.usetex': False,
-    'figure.autolayout': True,
-    'axes.unicode_minus': False,
-    'animation.embed_limit': 0,   # Não gera base64 temporário
-    'interactive': False,
-    'path.simplify': True,
-    'path.simplify_threshold': 1.0,
-    'agg.path.chunksize': 1000
-})
-matplotlib.font_manager._load_fontmanager(try_read_cache=True)
+from apelog_app.model.audio import MediaModel, AUDIO_EXTENSIONS
+from apelog_app import profiling
+from apelog_app.model.prefetch import Prefetcher
+from apelog_app.model.playback import PlaybackEngine
+from apelog_app.model.markers import MarkerStore, MarkerLayer, AUTO, MANUAL
+from apelog_app.model.spectrogram import SpectrogramTiles
+from apelog_app.model.analysis_cache import AnalysisCache
 
 # ---------------------------
-# AUDIO MODEL
+# PLOTTING SETUP
 # ---------------------------
 
-class MediaModel:
-    def __init__(self):
-        self.y = None
-        self.sr = None
-        self.ts = None
-        self.duration = 0.0
+_plt = None
+
+def pyplot():
+    """Importa e configura o matplotlib (backend Kivy) na primeira vez que a waveform é desenhada."""
+    global _plt
+    if _plt is not None:
+        return _plt
+
+    import matplotlib
+    matplotlib.use("module://kivy_garden.matplotlib.backend_kivy")  # Usa o backend certo
+    import matplotlib.pyplot as plt
+
+    logging.getLogger('matplotlib').setLevel(logging.WARNING) # Suprime warnings do matplotlib
+
+    # Configurações globais do matplotlib para evitar score das fontes
+    matplotlib.rcParams.update({
+        'font.family': 'DejaVu Sans',
+        'text.usetex': False,
+        'figure.autolayout': True,
+        'axes.unicode_minus': False,
+        'animation.embed_limit': 0,   # Não gera base64 temporário
+        'interactive': False,
+        'path.simplify': True,
+        'path.simplify_threshold': 1.0,
+        'agg.path.chunksize': 1000
+    })
+    matplotlib.font_manager._load_fontmanager(try_read_cache=True)
+    _plt = plt
+    return plt
 
-    def _librosa_load(self, file_path):
-        """Carrega o arquivo de áudio usando librosa."""
-        try:
-            self.y, self.sr = sf.read(file_path)
-            self.ts = np.arange(len(self.y)) / self.sr
-            self.duration = len(self.y) / self.sr
-            return True
-        except Exception as e:
-            print(f"Erro ao carregar áudio: {e}")
-            return False
-
-    def segment(self, start, duration):
-        """Retorna um trecho do áudio em um intervalo de tempo específico."""
-        start_sample = int(start * self.sr)
-        end_sample = int((start + duration) * self.sr)
-        end_sample = min(end_sample, len(self.y))
-        
-        seg = type("Segment", (), {})()  # objeto dinâmico simples
-        seg.ys = self.y[start_sample:end_sample]
-        seg.ts = np.arange(len(seg.ys)) / self.sr + start
-        seg.framerate = self.sr
-        seg.duration = len(seg.ys) / self.sr
-        return seg
-
-    def _estimate_fundamental_freq(self, peaks_points):
-        """Estima a frequência fundamental usando autocorrelação em segmentos ao redor dos picos locais."""
-        frequencies = []
-        for peak in peaks_points:
-            # Extract a segment around the peak (0.2s before and 0.2s after)
-            start = max(0, peak[0] - 0.2)
-            duration = 0.4
-            if start + duration > self.duration:
-                duration = self.duration - start
-
-            segment = self.segment(start=start, duration=duration)
-            if len(segment.ys) < 300:  # muito curto
-                frequencies.append(0)
-                continue
-
-            # Compute autocorrelation
-            corrs = np.correlate(segment.ys, segment.ys, mode='full')
-            corrs = corrs[len(corrs)//2:]
-            corrs /= np.max(np.abs(corrs))
-
-            # Find first local maximum in a reasonable lag range
-            lag = np.argmax(corrs[150:250]) + 150
-            period = lag / segment.framerate
-            frequency = 1 / period if period > 0 else 0
-            frequencies.append(frequency)
-
-        return frequencies
-
-    def _auto_generate_markers(self, interval=5.0):
-        """Gera marcadores automáticos a partir de intervalos de tempo fixos."""
-        total_duration = self.duration
-        num_slices = max(1, int(total_duration / interval))
-        
-        local_maxima_points = []
-
-        # Thresholds
-        std_dev = np.std(self.y)
-        noise_factor = 15
-        freq_threshold = 90
-        amp_threshold = 0.05 + (std_dev * noise_factor)
-
-        # Process each slice
-        for i in range(num_slices):
-            start_time = i * interval
-            duration = min(interval, total_duration - start_time)
-            segment = self.segment(start=start_time, duration=duration)
-
-            # Find local max
-            if len(segment.ys) == 0:
-                continue
-
-            result = np.argmax(segment.ys)
-            if segment.ys[result] > amp_threshold:
-                local_maxima_points.append((segment.ts[result], segment.ys[result]))
-
-        # Filter by fundamental frequency
-        frequencies = self._estimate_fundamental_freq(local_maxima_points)
-        filtered_points = [
-            point for i, point in enumerate(local_maxima_points)
-            if frequencies[i] >= freq_threshold
-        ]
-
-        return filtered_points
-        
+# ---------------------------
+# GUI MODEL
+# ---------------------------
 
 class AudioFilesModel(MediaModel):
     def __init__(self):
         super().__init__()
         self.is_playing = False
         self.is_paused = False
-        self.play_start_time = 0.0
         self.current_time = 0.0
         self.start_sample = 0
-        self.thread = None
-        self.audio_extensions = (".mp3", ".wav", ".flac", ".ogg")
+        self.engine = PlaybackEngine()  # stream de saída persistente, relógio em amostras
+        self.audio_extensions = AUDIO_EXTENSIONS
         self.fig = None
         self.ax = None
-        self.markers = {}  # {file_path: [(time, amplitude), ...]}
+        self.spec_ax = None  # lane do espectrograma, abaixo da waveform (None = desligado)
+        self.show_spectrogram = True
+        self.spectrogram = SpectrogramTiles()  # tiles de STFT calculados sob demanda, com cache
+        self.spectrogram_images = {}  # {chave do tile: AxesImage} desenhados na lane
+        self.waveform_lines = []  # Line2D da waveform (uma por canal)
+        self.rms_band = []  # uma faixa de RMS por canal
+        self.view = (0.0, 0.0)  # intervalo de tempo visível (s)
+        self.markers = {}  # {file_path: MarkerStore}, compartilhado com canvas e tabela
+        self.marker_layer = MarkerLayer()  # um LineCollection por tipo de marcador
         self.audio_analysis = False # Habilita/desabilita análise automática de marcadores
+        self.prefetcher = Prefetcher(self, radius=2)  # vizinhos na playlist decodificados em background
+        self.disk_cache = AnalysisCache()  # reabrir o projeto não recalcula resumos nem marcadores inalterados
 
-    def _playback_loop(self):
-        """Thread interna para reprodução assíncrona."""
-        self.start_sample = int(self.current_time * self.sr)
-        self.play_start_time = time.time()  # tracking para o pause
-
-        sd.play(self.y[self.start_sample:], self.sr, blocking=False)
-
-        # Espera até o áudio terminar ou ser pausado
-        while self.is_playing and not self.is_paused and sd.get_stream() is not None and sd.get_stream().active:
-            time.sleep(0.1)
-
-        # Quando o áudio termina
-        if self.is_playing and not self.is_paused:
-            self.is_playing = False
-            self.current_time = 0.0
-        print("Reprodução concluída.")
+    def finish_playback(self):
+        """Volta ao início depois que o buffer chegou ao fim (na thread da UI, via engine.on_finished)."""
+        if self.engine.playing:
+            return  # uma nova reprodução começou antes deste aviso ser tratado
+        self.is_playing = False
+        self.is_paused = False
+        self.current_time = 0.0
 
     # ---------------------------
     # PLAYBACK CONTROLS
     # ---------------------------
 
+    @property
+    def playback_time(self):
+        """Posição exata da reprodução (s), a partir do relógio em amostras do engine."""
+        if self.is_playing and not self.is_paused:
+            return self.engine.time
+        return self.current_time
+
     def play(self, file_path=None):
         """Inicia a reprodução do áudio."""
         if file_path:
@@ -196,8 +113,9 @@ class AudioFilesModel(MediaModel):
             self.is_playing = True
             self.is_paused = False
 
-        self.thread = threading.Thread(target=self._playback_loop, daemon=True)
-        self.thread.start()
+        # current_time pode ter sido alterado (seek, troca de arquivo) enquanto pausado
+        self.start_sample = int(round(self.current_time * self.sr))
+        self.engine.start(self.y, self.sr, self.start_sample)
 
     def pause(self):
         """Pausa a reprodução do áudio."""
@@ -210,11 +128,8 @@ class AudioFilesModel(MediaModel):
             return
 
         self.is_paused = True
-        sd.stop()
-
-        # Computa o tempo atual
-        elapsed = time.time() - self.play_start_time
-        self.current_time += elapsed
+        self.start_sample = self.engine.pause()
+        self.current_time = self.start_sample / self.sr
         print(f"Áudio pausado em {self.current_time:.2f} segundos.")
 
     def seek(self, time_position=0):
@@ -225,7 +140,8 @@ class AudioFilesModel(MediaModel):
             print("Posição inválida.")
             return
         self.current_time = time_position
-        sd.stop()
+        self.engine.pause()
+        self.engine.seek(int(round(time_position * self.sr)))
         self.is_playing = False
         self.is_paused = False
 
@@ -241,7 +157,7 @@ class AudioFilesModel(MediaModel):
             if (os.path.isfile(path) and path.lower().endswith(self.audio_extensions)) and (os.path.abspath(path) not in audio_files):
                 audio_files.append(os.path.abspath(path))
                 
-        self.generate_waveform(audio_files[0])  # Gera a waveform do primeiro arquivo (cache para performance)
+        self.prefetcher.prefetch(audio_files[:1])  # Decodifica o primeiro arquivo em background (cache para performance)
         return audio_files
     
     def _remove_from_app(self, file_name, audio_files):
@@ -261,77 +177,208 @@ class AudioFilesModel(MediaModel):
     def init_waveform_fig(self):
         """Cria a figura e o fig uma única vez."""
         if self.fig is None:
-            self.fig, self.ax = plt.subplots(figsize=(10, 3), dpi=80)
+            if self.show_spectrogram:
+                self.fig, (self.ax, self.spec_ax) = pyplot().subplots(
+                    2, 1, figsize=(10, 3), dpi=80, sharex=True, gridspec_kw={"height_ratios": [3, 2]}
+                )
+            else:
+                self.fig, self.ax = pyplot().subplots(figsize=(10, 3), dpi=80)
+                self.spec_ax = None
             self.fig.patch.set_facecolor('#191919')
-            self.ax.set_facecolor('#191919')
-            self.ax.set_autoscale_on(False)
-            self.ax.autoscale(enable=False)
-            self.ax.spines['top'].set_visible(False)
-            self.ax.spines['right'].set_visible(False)
-
-    def generate_waveform(self, file_path):
-        """Gera e retorna a figura Matplotlib com marcadores automáticos."""
+            for ax in self.fig.axes:
+                ax.set_facecolor('#191919')
+                ax.set_autoscale_on(False)
+                ax.autoscale(enable=False)
+                ax.spines['top'].set_visible(False)
+                ax.spines['right'].set_visible(False)
+
+    def reset_waveform_fig(self):
+        """Descarta a figura (ex.: ao ligar/desligar o espectrograma); a próxima waveform cria outra."""
+        if self.fig is not None:
+            pyplot().close(self.fig)
+        self.fig = self.ax = self.spec_ax = None
+        self.spectrogram_images = {}
+
+    def waveform_pixels(self):
+        """Largura da figura em pixels (resolução máxima útil da waveform)."""
         if self.fig is None or self.ax is None:
             self.init_waveform_fig()
+        width, _ = self.fig.get_size_inches()
+        return int(width * self.fig.dpi)
+
+    @profiling.traced("prepare_waveform")
+    def prepare_waveform(self, file_path, n_pixels, cancelled=None):
+        """Parte pesada da waveform (decodificação, resumos e marcadores), segura para rodar num worker.
+
+        Não altera o estado do modelo: trabalha numa cópia rasa ligada à entrada do cache.
+        Retorna None se `cancelled` for acionado antes do fim.
+        """
+        entry = self._fetch_entry(file_path, cancelled)
+        if entry is None or (cancelled is not None and cancelled.is_set()):
+            return None
 
-        try:
-            # Carrega o áudio completo para análise
-            self._librosa_load(file_path)
+        view = copy.copy(self)
+        view._use_entry(file_path, entry)
 
-            # Reduz resolução só para exibir mais rápido
-            y = self.y
-            sr = self.sr
-            MAX_POINTS = len(y) if len(y) < 100000 else 100000
-            if len(y) > MAX_POINTS:
-                downsample_factor = len(y) // MAX_POINTS
-                y = y[::downsample_factor]
-                sr_effective = sr / downsample_factor
-            else:
-                sr_effective = sr
-            
-            t = np.arange(len(y)) / sr_effective
+        # Busca só o nível da pirâmide que cabe na largura em pixels
+        t, y, rms = view.waveform_envelope(n_pixels)
+
+        store = self.markers.get(file_path)
+        if self.audio_analysis and (store is None or not store.detected) and entry.markers is None:
+            entry.markers = view._auto_generate_markers(interval=5.0)
+
+        return {"file_path": file_path, "entry": entry, "t": t, "y": y, "rms": rms}
+
+    @profiling.traced("figure_build")
+    def render_waveform(self, data):
+        """Aplica o resultado de prepare_waveform ao modelo e desenha a figura (thread principal)."""
+        if self.fig is None or self.ax is None:
+            self.init_waveform_fig()
 
-            # Limpa e desenha waveform
-            self.ax.clear()
-            self.ax.set_facecolor('#111')
+        file_path = data["file_path"]
+        t, y, rms = data["t"], data["y"], data["rms"]
+        self._use_entry(file_path, data["entry"])
 
+        # Limpa e desenha waveform
+        self.ax.clear()
+        self.ax.set_facecolor('#111')
+
+        # Uma faixa (lane) por canal, empilhadas de cima para baixo no mesmo eixo
+        offsets = self.lane_offsets()
+        for offset in offsets:
             for yline in [-1, -0.5, 0, 0.5, 1]:
-                self.ax.axhline(y=yline, color='#333', linestyle='-', linewidth=0.8, alpha=0.5)
-            
-            self.ax.plot(t, y, color="#ca8c18", linewidth=0.8, antialiased=True, rasterized=True)
-
-            self.ax.set_xlim(0, t[-1])
-            self.ax.set_ylim(-1, 1)
-            self.ax.set_title(os.path.basename(file_path), color='white', fontsize=10, pad=6)
-            self.ax.tick_params(axis='x', colors='gray', labelsize=8)
-            self.ax.tick_params(axis='y', colors='gray', labelsize=8)
-            self.fig.tight_layout(pad=0.5)
-
-            if self.audio_analysis:
-                # Armazena e reutiliza marcadores
-                if file_path not in self.markers:
-                    markers = self._auto_generate_markers(interval=5.0)
-                    self.markers[file_path] = markers  # guarda no dicionário
-                    print(f"{len(markers)} marcadores detectados e armazenados.")
-                else:
-                    markers = self.markers[file_path]
-                    print(f"Marcadores já existentes para {os.path.basename(file_path)} ({len(markers)}).")
-
-                # Desenha marcadores na waveform
-                for (time, amp) in markers:
-                    self.ax.axvline(
-                        x=time, color="#34f1ff", linestyle='--', linewidth=1.2, alpha=0.8
-                    )
-
-            return self.fig
+                self.ax.axhline(y=yline + offset, color='#333', linestyle='-', linewidth=0.8, alpha=0.5)
+
+        self.rms_band = []
+        self._draw_rms_band(t, rms)
+        lanes = y if y.ndim == 1 else y + offsets
+        self.waveform_lines = self.ax.plot(t, lanes, color="#ca8c18", linewidth=0.8, antialiased=True, rasterized=True)
+
+        self.view = (0.0, self.duration)
+        self.ax.set_xlim(*self.view)
+        self.ax.set_ylim(offsets[-1] - 1, 1)
+        if len(offsets) > 1:
+            self.ax.set_yticks(offsets, labels=self.lane_labels())
+        self.ax.set_title(os.path.basename(file_path), color='white', fontsize=10, pad=6)
+        self.ax.tick_params(axis='x', colors='gray', labelsize=8)
+        self.ax.tick_params(axis='y', colors='gray', labelsize=8)
+        self.fig.tight_layout(pad=0.5)
+
+        store = self.marker_store(file_path)
+        if self.audio_analysis:
+            # Armazena e reutiliza marcadores
+            if not store.detected:
+                if self.entry.markers is None:
+                    self.entry.markers = self._auto_generate_markers(interval=5.0)
+                store.add_many([time for time, amp in self.entry.markers], kind=AUTO)
+                store.detected = True
+                print(f"{len(self.entry.markers)} marcadores detectados e armazenados.")
+            else:
+                print(f"Marcadores já existentes para {os.path.basename(file_path)} ({len(store)}).")
+
+        if self.spec_ax is not None:
+            self.spec_ax.clear()
+            self.spec_ax.set_autoscale_on(False)  # imshow não pode mexer no xlim compartilhado
+            self.spec_ax.set_facecolor('#111')
+            self.spec_ax.set_ylim(0, self.spectrogram.fmax or self.sr / 2)
+            self.spec_ax.set_ylabel("Hz", color='gray', fontsize=8)
+            self.spec_ax.tick_params(axis='both', colors='gray', labelsize=8)
+            self.spectrogram_images = {}
+            self.draw_spectrogram()
+
+        self.marker_layer.attach(self.ax)
+        self.draw_markers()
+
+        return self.fig
+
+    def lane_offsets(self):
+        """Deslocamento vertical do zero de cada canal (lanes de altura 2, de cima para baixo)."""
+        return [-2.0 * c for c in range(max(1, self.channels))]
+
+    def lane_labels(self):
+        """Rótulos das lanes no eixo y."""
+        if self.channels == 2:
+            return ["L", "R"]
+        return [f"Ch {c + 1}" for c in range(self.channels)]
+
+    def _draw_rms_band(self, t, rms):
+        """(Re)desenha as faixas de RMS atrás da waveform; sem RMS (amostras brutas) as faixas somem."""
+        for band in self.rms_band:
+            band.remove()
+        self.rms_band = []
+        if rms is None:
+            return
+        bands = rms.reshape(len(rms), -1)
+        for band, offset in zip(bands.T, self.lane_offsets()):
+            self.rms_band.append(self.ax.fill_between(
+                t[::2], offset - band, offset + band, color="#7a5510", linewidth=0, rasterized=True
+            ))
+
+    @profiling.traced("view_update")
+    def set_waveform_view(self, t0, t1):
+        """Mostra só o intervalo [t0, t1] da waveform atual, buscando o nível de detalhe que cabe na largura.
+
+        Perto da escala de amostras, os dados vêm direto do sinal; afastado, da pirâmide.
+        """
+        t, y, rms = self.waveform_envelope(self.waveform_pixels(), t0, t1)
+        for i, (line, offset) in enumerate(zip(self.waveform_lines, self.lane_offsets())):
+            line.set_data(t, y if y.ndim == 1 else y[:, i] + offset)
+        self._draw_rms_band(t, rms)
+        self.view = (t0, t1)
+        self.ax.set_xlim(t0, t1)
+        self.draw_markers()
+        self.draw_spectrogram()
 
+    def generate_waveform(self, file_path):
+        """Gera e retorna a figura Matplotlib com marcadores automáticos."""
+        try:
+            data = self.prepare_waveform(file_path, self.waveform_pixels())
+            return self.render_waveform(data)
         except Exception as e:
             print(f"Erro ao gerar waveform: {e}")
             return None
 
+    @profiling.traced("markers_draw")
+    def draw_markers(self):
+        """Atualiza o desenho dos marcadores do arquivo atual no intervalo visível."""
+        if self.view is not None:
+            self.marker_layer.update(self.markers.get(self.file_path), *self.view, self.waveform_pixels())
+
+    @profiling.traced("spectrogram_draw")
+    def draw_spectrogram(self):
+        """Mostra na lane os tiles do espectrograma que cobrem a visão atual.
+
+        Tiles ainda não calculados ficam em branco; `spectrogram.on_ready` avisa quando
+        chegam e basta chamar este método de novo. Tiles fora da visão saem da figura.
+        """
+        if self.spec_ax is None or self.y is None or self.file_path is None:
+            return
+        tiles = self.spectrogram.visible(self.file_path, self.y, self.sr, *self.view, self.waveform_pixels())
+
+        images = {}
+        for key, extent, tile in tiles:
+            image = self.spectrogram_images.pop(key, None)
+            if image is None and tile is not None:
+                image = self.spec_ax.imshow(
+                    tile, extent=extent, origin="lower", aspect="auto", cmap="magma",
+                    vmin=self.spectrogram.floor_db, vmax=0.0, interpolation="nearest", rasterized=True,
+                )
+            if image is not None:
+                images[key] = image
+        for image in self.spectrogram_images.values():
+            image.remove()
+        self.spectrogram_images = images
+
+    def marker_store(self, file_path):
+        """Retorna (criando se preciso) o MarkerStore do arquivo."""
+        if file_path not in self.markers:
+            self.markers[file_path] = MarkerStore()
+        return self.markers[file_path]
+
     def clear_markers(self, file_path=None):
         """Remove marcadores de um arquivo específico ou de todos."""
         if file_path:
             self.markers.pop(file_path, None)
         else:
             self.markers.clear()
+        self.cache.clear_markers(file_path)
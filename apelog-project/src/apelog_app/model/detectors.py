@@ -0,0 +1,265 @@
+"""Detectores de eventos plugáveis.
+
+Cada detector é uma classe registrada em DETECTORS com parâmetros padrão (`defaults`).
+Um detector recebe um modelo com sinal 1-D (`model.y`, `model.sr`) e devolve os
+instantes e amplitudes dos eventos; os detectores por frame calculam suas features
+sobre views em janela deslizante do sinal, um bloco grande de frames por chamada
+NumPy. Numa cadeia, o primeiro detector gera os eventos e os seguintes filtram.
+"""
+
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from apelog_app import profiling
+
+DETECTORS = {}  # {nome: classe do detector}, na ordem de registro
+CHAIN_TOLERANCE = 0.1  # s; numa cadeia, distância máxima até um evento do detector seguinte
+
+def register(cls):
+    """Decorador: registra um detector em DETECTORS pelo seu `name`."""
+    DETECTORS[cls.name] = cls
+    return cls
+
+# ---------------------------
+# FRAMES / PEAKS
+# ---------------------------
+
+def iter_frames(y, frame, hop, block_frames=8192):
+    """Percorre os frames de `frame` amostras a cada `hop` em blocos: gera (índice do 1º frame, frames 2-D).
+
+    Os frames são views (sliding_window_view) de um trecho contíguo do sinal; só um
+    bloco de `block_frames` frames fica na memória por vez.
+    """
+    n_frames = 1 + (len(y) - frame) // hop if len(y) >= frame else 0
+    for f0 in range(0, n_frames, block_frames):
+        f1 = min(n_frames, f0 + block_frames)
+        chunk = np.asarray(y[f0 * hop:(f1 - 1) * hop + frame], dtype=np.float32)
+        yield f0, sliding_window_view(chunk, frame)[::hop]
+
+def frame_features(y, frame, hop, func):
+    """Concatena `func(frames)` de todos os blocos de frames (um resultado por frame)."""
+    parts = [func(frames) for _, frames in iter_frames(y, frame, hop)]
+    return np.concatenate(parts) if parts else np.empty((0, 2))
+
+def pick_peaks(feature, threshold, min_distance):
+    """Índices dos máximos locais de `feature` acima de `threshold`, afastados de pelo menos `min_distance` frames.
+
+    Máximo em janela deslizante de ±min_distance frames: um frame é pico se for o
+    maior da vizinhança; em platôs só o primeiro frame do grupo fica.
+    """
+    d = max(1, int(min_distance))
+    if len(feature) == 0:
+        return np.empty(0, dtype=np.int64)
+    padded = np.pad(feature, d, constant_values=-np.inf)
+    neighbourhood = sliding_window_view(padded, 2 * d + 1).max(axis=1)
+    peaks = np.flatnonzero((feature >= neighbourhood) & (feature > threshold))
+    if len(peaks) > 1:
+        peaks = peaks[np.concatenate([[True], np.diff(peaks) > d])]
+    return peaks
+
+def robust_threshold(feature, k):
+    """Mediana + k desvios (MAD escalado) da feature: um piso de ruído insensível aos próprios eventos."""
+    median = np.median(feature)
+    mad = 1.4826 * np.median(np.abs(feature - median))
+    return median + k * mad
+
+# ---------------------------
+# BASE
+# ---------------------------
+
+class Detector:
+    """Base dos detectores: `detect` gera eventos; `filter` decide quais eventos de outro detector ficam."""
+    name = ""
+    label = ""
+    source = True  # pode ser o primeiro da cadeia
+    defaults = {}
+
+    def __init__(self, **params):
+        unknown = set(params) - set(self.defaults)
+        if unknown:
+            raise ValueError(f"parâmetros desconhecidos para {self.name}: {', '.join(sorted(unknown))}")
+        self.params = {**self.defaults, **params}
+
+    def detect(self, model):
+        """Retorna (tempos em s, amplitudes), arrays em ordem de tempo."""
+        raise NotImplementedError
+
+    def filter(self, model, times, amps):
+        """Máscara dos eventos que este detector também encontra a até CHAIN_TOLERANCE s."""
+        own, _ = self.detect(model)
+        if len(own) == 0 or len(times) == 0:
+            return np.zeros(len(times), dtype=bool)
+        pos = np.searchsorted(own, times)
+        before = own[np.clip(pos - 1, 0, len(own) - 1)]
+        after = own[np.clip(pos, 0, len(own) - 1)]
+        distance = np.minimum(np.abs(times - before), np.abs(after - times))
+        return distance <= CHAIN_TOLERANCE
+
+class FrameDetector(Detector):
+    """Detector por frames: feature por frame -> limiar -> picos. Subclasses definem `features`."""
+
+    def frame_sizes(self, sr):
+        frame = max(2, int(self.params["frame"] * sr))
+        hop = max(1, int(self.params["hop"] * sr))
+        return frame, hop
+
+    def features(self, frames):
+        """Array (n_frames, 2): feature de detecção e amplitude de pico de cada frame."""
+        raise NotImplementedError
+
+    def threshold(self, feature):
+        raise NotImplementedError
+
+    def detect(self, model):
+        frame, hop = self.frame_sizes(model.sr)
+        values = frame_features(model.y, frame, hop, self.features)
+        feature, peak = values[:, 0], values[:, 1]
+        peaks = pick_peaks(feature, self.threshold(feature), self.params["min_gap"] * model.sr / hop)
+        times = (peaks * hop + frame / 2) / model.sr
+        return times, peak[peaks]
+
+# ---------------------------
+# DETECTORS
+# ---------------------------
+
+@register
+class SlicePeakDetector(Detector):
+    """Regra original: máximo de cada fatia de `interval` s acima de 0,05 + noise_factor·σ, com f0 >= freq_threshold."""
+    name = "slice_peak"
+    label = "Pico por fatia"
+    defaults = {"interval": 5.0, "noise_factor": 15.0, "freq_threshold": 90.0}
+
+    def detect(self, model):
+        points = model._detect_signal(
+            self.params["interval"], self.params["noise_factor"], self.params["freq_threshold"]
+        )
+        times = np.array([t for t, _ in points], dtype=float)
+        amps = np.array([amp for _, amp in points], dtype=float)
+        return times, amps
+
+@register
+class RMSDetector(FrameDetector):
+    """Energia: picos do RMS (dB) a mais de `threshold_db` acima do piso de ruído."""
+    name = "rms"
+    label = "Energia (RMS)"
+    defaults = {"frame": 0.025, "hop": 0.010, "threshold_db": 12.0, "min_gap": 0.25}
+
+    def features(self, frames):
+        power = np.einsum("ij,ij->i", frames, frames) / frames.shape[1]
+        db = 10 * np.log10(power + 1e-12)
+        return np.column_stack([db, np.abs(frames).max(axis=1)])
+
+    def threshold(self, feature):
+        return np.median(feature) + self.params["threshold_db"]
+
+@register
+class SpectralFluxDetector(FrameDetector):
+    """Onsets: aumento positivo do espectro de log-magnitude entre frames (spectral flux)."""
+    name = "flux"
+    label = "Spectral flux (onset)"
+    defaults = {"frame": 0.023, "hop": 0.0116, "k": 6.0, "min_gap": 0.1}
+
+    def detect(self, model):
+        frame, hop = self.frame_sizes(model.sr)
+        window = np.hanning(frame).astype(np.float32)
+        parts = []
+        previous = None  # último espectro do bloco anterior
+        for _, frames in iter_frames(model.y, frame, hop):
+            spectra = np.log1p(10 * np.abs(np.fft.rfft(frames * window, axis=1))).astype(np.float32)
+            reference = np.vstack([spectra[:1] if previous is None else previous, spectra[:-1]])
+            flux = np.maximum(spectra - reference, 0).sum(axis=1)
+            parts.append(np.column_stack([flux, np.abs(frames).max(axis=1)]))
+            previous = spectra[-1:]
+        values = np.concatenate(parts) if parts else np.empty((0, 2))
+
+        feature, peak = values[:, 0], values[:, 1]
+        peaks = pick_peaks(feature, robust_threshold(feature, self.params["k"]), self.params["min_gap"] * model.sr / hop)
+        return (peaks * hop + frame / 2) / model.sr, peak[peaks]
+
+@register
+class ZCRDetector(FrameDetector):
+    """Taxa de cruzamentos por zero: sons ruidosos/agudos (cliques, fricativas) acima de um piso de energia."""
+    name = "zcr"
+    label = "Zero-crossing rate"
+    defaults = {"frame": 0.025, "hop": 0.010, "threshold": 0.3, "min_rms_db": -40.0, "min_gap": 0.25}
+
+    def features(self, frames):
+        crossings = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1) / (frames.shape[1] - 1)
+        power = np.einsum("ij,ij->i", frames, frames) / frames.shape[1]
+        gated = np.where(10 * np.log10(power + 1e-12) >= self.params["min_rms_db"], crossings, 0.0)
+        return np.column_stack([gated, np.abs(frames).max(axis=1)])
+
+    def threshold(self, feature):
+        return self.params["threshold"]
+
+@register
+class PitchFilter(Detector):
+    """Filtro: mantém eventos com frequência fundamental (autocorrelação, ±0,2 s) >= freq_threshold."""
+    name = "pitch"
+    label = "Filtro de frequência"
+    source = False
+    defaults = {"freq_threshold": 90.0}
+
+    def filter(self, model, times, amps):
+        frequencies = np.asarray(model._estimate_fundamental_freq(list(zip(times, amps))))
+        return frequencies >= self.params["freq_threshold"] if len(times) else np.zeros(0, dtype=bool)
+
+# ---------------------------
+# CHAINS
+# ---------------------------
+
+def validate_chain(chain):
+    """Confere nomes, parâmetros e se o primeiro detector pode gerar eventos; ValueError se não."""
+    if not chain:
+        raise ValueError("nenhum detector selecionado")
+    for name, params in chain:
+        if name not in DETECTORS:
+            raise ValueError(f"detector desconhecido: {name}")
+        DETECTORS[name](**params)
+    if not DETECTORS[chain[0][0]].source:
+        raise ValueError(f"{chain[0][0]} só pode filtrar eventos de outro detector")
+
+def run_chain(model, chain, timings=None):
+    """Roda a cadeia [(nome, parâmetros), ...] sobre `model.y` (1-D). Retorna [(tempo, amplitude), ...].
+
+    O tempo de cada detector é somado em `timings` ({nome: segundos}), se dado.
+    """
+    times = amps = None
+    for i, (name, params) in enumerate(chain):
+        detector = DETECTORS[name](**params)
+        start = time.perf_counter()
+        with profiling.span(f"detector.{name}"):
+            if i == 0:
+                times, amps = detector.detect(model)
+            else:
+                keep = detector.filter(model, times, amps)
+                times, amps = times[keep], amps[keep]
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+    return list(zip(times.tolist(), amps.tolist()))
+
+def parse_params(text):
+    """"chave=valor, chave=valor" -> {chave: float}."""
+    params = {}
+    for item in text.replace(";", ",").split(","):
+        if not item.strip():
+            continue
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"parâmetro inválido: {item.strip()}")
+        params[key.strip()] = float(value)
+    return params
+
+def format_params(params):
+    return ", ".join(f"{key}={value:g}" for key, value in params.items())
+
+def parse_stage(text):
+    """"nome" ou "nome:chave=valor,..." -> (nome, parâmetros)."""
+    name, _, params = text.partition(":")
+    return name.strip(), parse_params(params)
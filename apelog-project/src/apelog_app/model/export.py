@@ -0,0 +1,201 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import soundfile as sf
+
+from apelog_app import profiling
+
+EXPORT_FORMATS = {".wav": "WAV", ".flac": "FLAC", ".ogg": "OGG"}  # extensão -> formato do libsndfile
+
+# ---------------------------
+# CLIP LISTS
+# ---------------------------
+
+def clips_around(times, duration, pre_roll=0.5, post_roll=0.5):
+    """Trechos (início, fim) em segundos em torno de cada instante, limitados ao áudio."""
+    return [(max(0.0, t - pre_roll), min(duration, t + post_roll)) for t in sorted(times)]
+
+def clips_between(times, duration, pre_roll=0.0, post_roll=0.0):
+    """Trechos entre pares de marcadores (1º–2º, 3º–4º, ...); um marcador sem par no fim é ignorado."""
+    times = sorted(times)
+    return [
+        (max(0.0, start - pre_roll), min(duration, end + post_roll))
+        for start, end in zip(times[0::2], times[1::2])
+    ]
+
+def export_format(path):
+    """Formato do libsndfile correspondente à extensão de `path` (ou à própria extensão, ex.: ".flac")."""
+    ext = os.path.splitext(path)[1].lower() or path.lower()
+    if ext not in EXPORT_FORMATS:
+        raise ValueError(f"formato de exportação não suportado: {ext or path}")
+    return EXPORT_FORMATS[ext]
+
+# ---------------------------
+# SEGMENT EXPORTER
+# ---------------------------
+
+class SegmentExporter:
+    """Grava trechos de um arquivo de áudio em disco, lendo e escrevendo em blocos.
+
+    Cada thread do pool mantém seu próprio SoundFile de leitura (os objetos do
+    libsndfile não são thread-safe) e copia o trecho bloco a bloco para o arquivo de
+    saída: nenhum trecho, nem o sinal original, é carregado inteiro na memória. As
+    chamadas ao libsndfile liberam o GIL, então o custo fica limitado pelo disco.
+    """
+
+    def __init__(self, source_path, workers=4, blocksize=65536):
+        self.source_path = source_path
+        self.workers = workers
+        self.blocksize = blocksize
+        self.cancelled = threading.Event()  # interrompe a exportação no próximo bloco
+
+        with sf.SoundFile(source_path) as f:
+            self.sr, self.channels, self.frames = f.samplerate, f.channels, f.frames
+            self.source_subtype = f.subtype
+
+        self._local = threading.local()  # leitor e buffer de cada thread
+        self._readers = []
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self):
+        return self.frames / self.sr
+
+    def subtype_for(self, fmt, subtype=None):
+        """Subtipo de saída: o pedido, senão o do arquivo original (se o formato aceitar), senão o padrão."""
+        if subtype is not None:
+            return subtype
+        if sf.check_format(fmt, self.source_subtype):
+            return self.source_subtype
+        return sf.default_subtype(fmt)
+
+    # ---------------------------
+    # EXPORT
+    # ---------------------------
+
+    def export_clips(self, clips, out_dir, prefix="clip", ext=".wav", subtype=None, progress=None):
+        """Grava cada trecho (início, fim) num arquivo próprio em `out_dir`.
+
+        Retorna a lista de caminhos na ordem de `clips` (None nos que falharam ou foram cancelados).
+        `progress(feitos, total)` é chamado de uma thread do pool a cada trecho concluído.
+        """
+        fmt = export_format(ext)
+        subtype = self.subtype_for(fmt, subtype)
+        os.makedirs(out_dir, exist_ok=True)
+        paths = [None] * len(clips)
+
+        with profiling.span("export", clips=len(clips), format=fmt):
+            with ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="apelog-export") as pool:
+                futures = {}
+                for i, (start, end) in enumerate(clips):
+                    path = os.path.join(out_dir, f"{prefix}_{i + 1:04d}_{start:.3f}s{ext}")
+                    futures[pool.submit(self._write_clip, path, fmt, subtype, start, end)] = i
+
+                for done, future in enumerate(as_completed(futures), start=1):
+                    i = futures[future]
+                    try:
+                        paths[i] = future.result()
+                    except Exception as e:
+                        print(f"Erro ao exportar o trecho {i + 1}: {e}")
+                    if progress is not None:
+                        progress(done, len(clips))
+            self._close_readers()
+
+        profiling.count("export.clips", sum(path is not None for path in paths))
+        return paths
+
+    def export_concatenated(self, clips, out_path, subtype=None, gap=0.0, progress=None):
+        """Grava todos os trechos em sequência num único arquivo, separados por `gap` s de silêncio.
+
+        Retorna `out_path`, ou None se a exportação for cancelada (nenhum arquivo parcial fica em disco).
+        """
+        fmt = export_format(out_path)
+        silence = np.zeros((int(gap * self.sr), self.channels), dtype=np.float32)
+
+        with profiling.span("export", clips=len(clips), format=fmt, concatenated=True):
+            try:
+                path = self._write(out_path, fmt, self.subtype_for(fmt, subtype), clips, silence, progress)
+            finally:
+                self._close_readers()
+
+        if path is not None:
+            profiling.count("export.clips", len(clips))
+        return path
+
+    def cancel(self):
+        self.cancelled.set()
+
+    # ---------------------------
+    # STREAMING COPY
+    # ---------------------------
+
+    def _reader(self):
+        """SoundFile de leitura e buffer de blocos da thread atual (abertos uma vez por thread)."""
+        local = self._local
+        if getattr(local, "reader", None) is None:
+            local.reader = sf.SoundFile(self.source_path)
+            local.buffer = np.empty((self.blocksize, self.channels), dtype=np.float32)
+            with self._lock:
+                self._readers.append(local.reader)
+        return local.reader, local.buffer
+
+    def _close_readers(self):
+        with self._lock:
+            for reader in self._readers:
+                reader.close()
+            self._readers = []
+        self._local = threading.local()
+
+    def _write_clip(self, path, fmt, subtype, start, end):
+        return self._write(path, fmt, subtype, [(start, end)])
+
+    def _write(self, path, fmt, subtype, clips, silence=None, progress=None):
+        """Grava os trechos em sequência num temporário ao lado de `path` e só o renomeia no fim.
+
+        Retorna `path`, ou None se cancelado. Em cancelamento ou erro (de leitura, de escrita
+        ou KeyboardInterrupt) o temporário é removido: `path` nunca fica truncado.
+        """
+        tmp = os.path.join(os.path.dirname(path) or ".",
+                           f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            complete = True
+            with sf.SoundFile(tmp, "w", self.sr, self.channels, subtype, format=fmt) as writer:
+                for i, (start, end) in enumerate(clips):
+                    if i and silence is not None and len(silence):
+                        writer.write(silence)
+                    if not self._copy(writer, start, end):
+                        complete = False
+                        break
+                    if progress is not None:
+                        progress(i + 1, len(clips))
+            if not complete:
+                os.remove(tmp)
+                return None
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return path
+
+    def _copy(self, writer, start, end):
+        """Copia as amostras de [start, end) s do original para `writer`, bloco a bloco. False se cancelado."""
+        reader, buffer = self._reader()
+        pos = min(self.frames, max(0, int(round(start * self.sr))))
+        stop = min(self.frames, int(round(end * self.sr)))
+        reader.seek(pos)
+        while pos < stop:
+            if self.cancelled.is_set():
+                return False
+            block = reader.read(dtype="float32", out=buffer[:stop - pos])
+            if len(block) == 0:  # cabeçalho informou mais frames do que existem
+                break
+            writer.write(block)
+            pos += len(block)
+        return True
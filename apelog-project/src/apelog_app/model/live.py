@@ -0,0 +1,218 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import threading
+import time
+
+import numpy as np
+
+from apelog_app.model.audio import MediaModel
+from apelog_app.model.stats import RunningStats, WindowedStats
+from apelog_app import profiling
+
+# ---------------------------
+# LIVE DETECTOR
+# ---------------------------
+
+class LiveDetector:
+    """Detecção de eventos ao vivo a partir do microfone (sd.InputStream).
+
+    O callback de áudio só copia cada bloco para um buffer circular pré-alocado; uma
+    thread de análise aplica os mesmos critérios de `_auto_generate_markers` (máximo
+    de cada fatia de `interval` segundos acima do limiar de amplitude, frequência
+    fundamental por autocorrelação >= freq_threshold) assim que cada fatia e a margem
+    de 0,2 s da janela de autocorrelação estão disponíveis. Memória fixa (o buffer) e
+    latência limitada a uma fatia + margem, por mais longa que seja a captura.
+    """
+
+    def __init__(self, sr=44100, interval=5.0, buffer_seconds=None, blocksize=1024):
+        self.sr = sr
+        self.interval = interval
+        self.blocksize = blocksize
+        self.noise_factor = 15
+        self.threshold_mode = "global"  # "global": tudo o que já foi capturado; "windowed": últimos noise_window s
+        self.noise_window = 30.0
+        self.freq_threshold = 90
+        self.on_event = None  # callable(tempo_s, amplitude, horário_unix), chamado da thread de análise
+
+        self._margin = int(np.ceil(0.2 * sr)) + 1  # amostras após o pico usadas na autocorrelação
+        capacity = int((buffer_seconds or 2 * interval + 1) * sr)
+        if capacity < int(interval * sr) + 2 * self._margin:
+            raise ValueError("buffer menor que uma fatia de detecção + margens")
+        self._ring = np.zeros(capacity, dtype=np.float32)  # amostras mono (float32, como o InputStream), sobrescritas em círculo
+        self._scratch = np.empty(int(interval * sr) + 2 * self._margin + 1, dtype=np.float32)  # fatia contígua para a análise
+
+        self._analyzer = MediaModel()  # reaproveita _estimate_fundamental_freq sobre a fatia
+        self._analyzer.sr = sr
+        self.stats = self._new_stats()
+
+        self._stream = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self.started_at = None  # horário (unix) da primeira amostra
+        self.overruns = 0  # fatias descartadas porque a análise ficou para trás
+        self.status_errors = 0  # avisos de under/overflow reportados pelo PortAudio
+        self._reset_positions()
+
+    def _new_stats(self):
+        if self.threshold_mode == "windowed":
+            return WindowedStats(self.noise_window * self.sr, block=self.sr)
+        return RunningStats()
+
+    def _reset_positions(self):
+        self._written = 0  # total de amostras recebidas (só o callback escreve)
+        self._stats_pos = 0  # amostras já incorporadas às estatísticas
+        self._slice = 0  # próxima fatia a analisar
+
+    @property
+    def running(self):
+        return self._stream is not None
+
+    @property
+    def captured_seconds(self):
+        return self._written / self.sr
+
+    # ---------------------------
+    # CONTROLS
+    # ---------------------------
+
+    def start(self, device=None):
+        """Abre o microfone e começa a analisar. Se o microfone não abrir, a exceção sobe e nada fica rodando."""
+        if self.running:
+            return
+        import sounddevice as sd
+
+        self._reset_positions()
+        self.stats = self._new_stats()
+        # Abre o stream antes da thread: sem microfone, nenhuma thread de análise fica órfã
+        stream = sd.InputStream(
+            samplerate=self.sr, channels=1, dtype='float32', blocksize=self.blocksize,
+            device=device, callback=self._callback,
+        )
+        self._stop.clear()
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._analysis_loop, name="apelog-live", daemon=True)
+        self._thread.start()
+        try:
+            self.started_at = time.time()
+            stream.start()
+        except Exception:
+            stream.close()
+            self._join_analysis()
+            raise
+        self._stream = stream
+
+    def stop(self):
+        """Fecha o microfone e encerra a análise."""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self._join_analysis()
+
+    def _join_analysis(self):
+        self._stop.set()
+        self._ready.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # ---------------------------
+    # AUDIO THREAD
+    # ---------------------------
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            self.status_errors += 1
+        capacity = len(self._ring)
+        pos = self._written % capacity
+        first = min(frames, capacity - pos)
+        self._ring[pos:pos + first] = indata[:first, 0]
+        self._ring[:frames - first] = indata[first:, 0]
+        self._written += frames
+        self._ready.set()
+
+    # ---------------------------
+    # ANALYSIS THREAD
+    # ---------------------------
+
+    def _analysis_loop(self):
+        while not self._stop.is_set():
+            self._ready.wait(timeout=0.5)
+            self._ready.clear()
+            try:
+                self.process()
+            except Exception as e:
+                print(f"Erro na detecção ao vivo: {e}")
+
+    def _read(self, start, stop, out):
+        """Copia as amostras absolutas [start, stop) do buffer circular para `out`."""
+        capacity = len(self._ring)
+        n = stop - start
+        pos = start % capacity
+        first = min(n, capacity - pos)
+        out[:first] = self._ring[pos:pos + first]
+        out[first:n] = self._ring[:n - first]
+        return out[:n]
+
+    def _slice_bounds(self, k):
+        # Mesmos limites de MediaModel._slice_bounds
+        return int(k * self.interval * self.sr), int((k + 1) * self.interval * self.sr)
+
+    def process(self):
+        """Incorpora as amostras novas e analisa todas as fatias completas. Retorna os eventos emitidos."""
+        written = self._written
+        oldest = written - len(self._ring)  # amostras antes disso já foram sobrescritas
+
+        # Análise atrasada demais: pula para a fatia mais antiga ainda inteira no buffer
+        while max(0, self._slice_bounds(self._slice)[0] - self._margin) < oldest:
+            self._slice += 1
+            self.overruns += 1
+        self._stats_pos = max(self._stats_pos, oldest)
+
+        # Estatísticas (limiar de ruído) sobre tudo o que já foi capturado
+        while self._stats_pos < written:
+            stop = min(written, self._stats_pos + len(self._scratch))
+            self.stats.update(self._read(self._stats_pos, stop, self._scratch))
+            self._stats_pos = stop
+
+        events = []
+        while True:
+            start, end = self._slice_bounds(self._slice)
+            if end + self._margin > written:
+                break
+            event = self._detect_slice(start, end)
+            if event is not None:
+                events.append(event)
+                if self.on_event is not None:
+                    self.on_event(*event)
+            self._slice += 1
+        return events
+
+    @profiling.traced("live_detect")
+    def _detect_slice(self, start, end):
+        """Aplica os critérios de `_auto_generate_markers` a uma fatia; retorna (tempo, amplitude, horário) ou None."""
+        amp_threshold = 0.05 + self.stats.std * self.noise_factor
+
+        window_start = max(0, start - self._margin)
+        window = self._read(window_start, end + self._margin, self._scratch)
+        offset = start - window_start
+        idx = int(np.argmax(window[offset:offset + end - start]))
+        amp = float(window[offset + idx])
+        if amp <= amp_threshold:
+            return None
+
+        # Frequência fundamental na janela de ±0,2 s em torno do pico
+        analyzer = self._analyzer
+        analyzer.y = window
+        analyzer.duration = len(window) / self.sr
+        t_local = (offset + idx) / self.sr
+        frequency = analyzer._estimate_fundamental_freq([(t_local, amp)])[0]
+        if frequency < self.freq_threshold:
+            return None
+
+        t = (start + idx) / self.sr
+        profiling.count("live.events")
+        return t, amp, self.started_at + t if self.started_at else None
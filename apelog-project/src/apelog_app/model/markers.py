@@ -0,0 +1,246 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import numpy as np
+
+AUTO = "auto"
+MANUAL = "manual"
+KIND_CODES = {AUTO: 0, MANUAL: 1}
+
+# Estilo das linhas de marcador no gráfico, por tipo
+MARKER_STYLES = {
+    AUTO: dict(color="#34f1ff", linestyle='--', linewidth=1.2, alpha=0.8),
+    MANUAL: dict(color="#5ff033", linestyle='--', linewidth=1.5, zorder=9),
+}
+
+# ---------------------------
+# MARKER STORE
+# ---------------------------
+
+class MarkerStore:
+    """Marcadores de um arquivo: índice de tempos ordenado (NumPy) com IDs estáveis.
+
+    Busca por tempo, marcador mais próximo e consultas por intervalo são O(log n)
+    (searchsorted); inserir e remover deslocam a cauda dos arrays com uma única cópia
+    contígua, sem varrer a lista. Cada ID pode ter metadados (título, descrição)
+    associados. Compartilhado por modelo, canvas e tabela; o desenho fica com MarkerLayer.
+    """
+
+    def __init__(self):
+        self._times = np.empty(16)
+        self._ids = np.empty(16, dtype=np.int64)
+        self._codes = np.empty(16, dtype=np.int8)  # tipo de cada posição (KIND_CODES)
+        self._n = 0
+        self._next_id = 0
+        self.kinds = {}  # {id: AUTO | MANUAL}
+        self.time_of = {}  # {id: tempo (s)}
+        self.info = {}  # {id: {"title": ..., "description": ...}} (só os editados)
+        self.detected = False  # detecção automática já rodou para este arquivo
+
+    def __len__(self):
+        return self._n
+
+    def __iter__(self):
+        """Percorre (id, tempo) em ordem de tempo."""
+        return zip(self._ids[:self._n].tolist(), self._times[:self._n].tolist())
+
+    def __contains__(self, marker_id):
+        return marker_id in self.time_of
+
+    def times(self):
+        """Tempos em ordem crescente (view somente-leitura)."""
+        view = self._times[:self._n]
+        view.flags.writeable = False
+        return view
+
+    def ids(self):
+        """IDs na mesma ordem de `times()` (view somente-leitura)."""
+        view = self._ids[:self._n]
+        view.flags.writeable = False
+        return view
+
+    def kind_ids(self, kind):
+        """IDs de um tipo, em ordem de tempo."""
+        return self._ids[:self._n][self._codes[:self._n] == KIND_CODES[kind]].tolist()
+
+    # ---------------------------
+    # INSERT / DELETE
+    # ---------------------------
+
+    def add(self, time, kind=MANUAL):
+        """Insere um marcador e retorna seu ID."""
+        self._reserve(self._n + 1)
+        pos = int(np.searchsorted(self._times[:self._n], time, side='right'))
+        n = self._n
+        self._times[pos + 1:n + 1] = self._times[pos:n]
+        self._ids[pos + 1:n + 1] = self._ids[pos:n]
+        self._codes[pos + 1:n + 1] = self._codes[pos:n]
+        marker_id = self._next_id
+        self._times[pos] = time
+        self._ids[pos] = marker_id
+        self._codes[pos] = KIND_CODES[kind]
+
+        self._n += 1
+        self._next_id += 1
+        self.kinds[marker_id] = kind
+        self.time_of[marker_id] = float(time)
+        return marker_id
+
+    def add_many(self, times, kind=AUTO):
+        """Insere vários marcadores de uma vez (uma ordenação só) e retorna os IDs, na ordem recebida."""
+        times = np.asarray(times, dtype=float)
+        ids = np.arange(self._next_id, self._next_id + len(times), dtype=np.int64)
+        all_times = np.concatenate([self._times[:self._n], times])
+        all_ids = np.concatenate([self._ids[:self._n], ids])
+        all_codes = np.concatenate([self._codes[:self._n], np.full(len(times), KIND_CODES[kind], dtype=np.int8)])
+        order = np.argsort(all_times, kind='stable')
+
+        self._reserve(len(all_times))
+        self._times[:len(order)] = all_times[order]
+        self._ids[:len(order)] = all_ids[order]
+        self._codes[:len(order)] = all_codes[order]
+        self._n = len(order)
+        self._next_id += len(times)
+        for marker_id, time in zip(ids.tolist(), times.tolist()):
+            self.kinds[marker_id] = kind
+            self.time_of[marker_id] = time
+        return ids.tolist()
+
+    def remove(self, marker_id):
+        """Remove um marcador pelo ID."""
+        pos = self.rank(marker_id)
+        n = self._n
+        self._times[pos:n - 1] = self._times[pos + 1:n]
+        self._ids[pos:n - 1] = self._ids[pos + 1:n]
+        self._codes[pos:n - 1] = self._codes[pos + 1:n]
+        self._n -= 1
+
+        del self.kinds[marker_id]
+        del self.time_of[marker_id]
+        self.info.pop(marker_id, None)
+
+    def remove_kind(self, kind):
+        """Remove todos os marcadores de um tipo de uma vez e retorna seus IDs."""
+        n = self._n
+        drop = self._codes[:n] == KIND_CODES[kind]
+        removed = self._ids[:n][drop].tolist()
+        keep = np.flatnonzero(~drop)
+        for name in ("_times", "_ids", "_codes"):
+            array = getattr(self, name)
+            array[:len(keep)] = array[:n][keep]
+        self._n = len(keep)
+
+        for marker_id in removed:
+            del self.kinds[marker_id]
+            del self.time_of[marker_id]
+            self.info.pop(marker_id, None)
+        return removed
+
+    def clear(self):
+        """Remove todos os marcadores."""
+        self.__init__()
+
+    def _reserve(self, size):
+        if size <= len(self._times):
+            return
+        capacity = max(size, 2 * len(self._times))
+        for name in ("_times", "_ids", "_codes"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+
+    # ---------------------------
+    # QUERIES
+    # ---------------------------
+
+    def rank(self, marker_id):
+        """Posição do marcador na ordem de tempo."""
+        time = self.time_of[marker_id]
+        lo = int(np.searchsorted(self._times[:self._n], time, side='left'))
+        hi = int(np.searchsorted(self._times[:self._n], time, side='right'))
+        return lo + int(np.flatnonzero(self._ids[lo:hi] == marker_id)[0])
+
+    def find(self, time, kind=None):
+        """ID de um marcador exatamente em `time` (opcionalmente de um tipo), ou None."""
+        lo = int(np.searchsorted(self._times[:self._n], time, side='left'))
+        hi = int(np.searchsorted(self._times[:self._n], time, side='right'))
+        for marker_id in self._ids[lo:hi].tolist():
+            if kind is None or self.kinds[marker_id] == kind:
+                return marker_id
+        return None
+
+    def nearest(self, time):
+        """ID do marcador mais próximo de `time`, ou None se não houver marcadores."""
+        if self._n == 0:
+            return None
+        pos = int(np.searchsorted(self._times[:self._n], time))
+        candidates = [p for p in (pos - 1, pos) if 0 <= p < self._n]
+        best = min(candidates, key=lambda p: abs(self._times[p] - time))
+        return int(self._ids[best])
+
+    def in_range(self, t0, t1):
+        """IDs dos marcadores com tempo em [t0, t1], em ordem de tempo."""
+        lo = int(np.searchsorted(self._times[:self._n], t0, side='left'))
+        hi = int(np.searchsorted(self._times[:self._n], t1, side='right'))
+        return self._ids[lo:hi].tolist()
+
+    def visible(self, t0, t1, kind):
+        """Tempos dos marcadores de um tipo em [t0, t1], em ordem crescente."""
+        lo = int(np.searchsorted(self._times[:self._n], t0, side='left'))
+        hi = int(np.searchsorted(self._times[:self._n], t1, side='right'))
+        return self._times[lo:hi][self._codes[lo:hi] == KIND_CODES[kind]]
+
+# ---------------------------
+# MARKER LAYER
+# ---------------------------
+
+class MarkerLayer:
+    """Desenha os marcadores como um único LineCollection por tipo (automático / manual).
+
+    Só entram os marcadores do intervalo visível, no máximo um por coluna de pixel,
+    escritos num array de segmentos pré-alocado: o custo de desenho depende da
+    largura do gráfico, não do número de marcadores do arquivo.
+    """
+
+    def __init__(self):
+        self.collections = {}  # {tipo: LineCollection}
+        self._segments = {}  # {tipo: array (capacidade, 2, 2) reaproveitado entre atualizações}
+
+    def attach(self, ax):
+        """Cria as coleções em `ax` (descartando as de um eixo anterior)."""
+        from matplotlib.collections import LineCollection
+
+        for collection in self.collections.values():
+            if collection.axes is not None:
+                collection.remove()
+        self.collections = {}
+        for kind, style in MARKER_STYLES.items():
+            # x em dados, y de 0 a 1 na altura do eixo (como axvline)
+            collection = LineCollection([], transform=ax.get_xaxis_transform(), **style)
+            ax.add_collection(collection, autolim=False)
+            self.collections[kind] = collection
+
+    def update(self, store, t0, t1, n_pixels):
+        """Redesenha os marcadores de `store` visíveis em [t0, t1] numa largura de `n_pixels`."""
+        for kind, collection in self.collections.items():
+            times = store.visible(t0, t1, kind) if store is not None else np.empty(0)
+            if len(times) > n_pixels and t1 > t0:
+                # Mais marcadores que pixels: um por coluna basta
+                columns = ((times - t0) * (n_pixels / (t1 - t0))).astype(np.int64)
+                keep = np.ones(len(columns), dtype=bool)
+                np.not_equal(columns[1:], columns[:-1], out=keep[1:])
+                times = times[keep]
+            segments = self._buffer(kind, len(times))
+            segments[:, :, 0] = times[:, None]
+            collection.set_segments(segments)
+
+    def _buffer(self, kind, size):
+        segments = self._segments.get(kind)
+        if segments is None or len(segments) < size:
+            segments = np.empty((max(size, 64), 2, 2))
+            segments[:, 0, 1] = 0.0
+            segments[:, 1, 1] = 1.0
+            self._segments[kind] = segments
+        return segments[:size]
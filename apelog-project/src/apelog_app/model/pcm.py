@@ -0,0 +1,156 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import os
+import struct
+
+import numpy as np
+
+# (formato, bits) -> (dtype no arquivo, deslocamento, escala para [-1, 1])
+_WAV_FORMATS = {
+    (1, 8): ("u1", 128.0, 1 / 128),
+    (1, 16): ("<i2", 0.0, 1 / 32768),
+    (1, 32): ("<i4", 0.0, 1 / 2147483648),
+    (3, 32): ("<f4", 0.0, 1.0),
+    (3, 64): ("<f8", 0.0, 1.0),
+}
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# ---------------------------
+# WAV HEADER
+# ---------------------------
+
+def wav_layout(file_path):
+    """Lê o cabeçalho RIFF/WAVE e retorna (offset, frames, channels, samplerate, fmt, bits) do payload, ou None."""
+    with open(file_path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            return None
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id = header[:4]
+            size = struct.unpack("<I", header[4:])[0]
+
+            if chunk_id == b"fmt ":
+                body = f.read(size + size % 2)
+                if len(body) < 16:
+                    return None
+                tag, channels, sr, _, block_align, bits = struct.unpack("<HHIIHH", body[:16])
+                if tag == _WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    tag = struct.unpack("<H", body[24:26])[0]  # início do GUID do subformato
+                fmt = (tag, channels, sr, block_align, bits)
+            elif chunk_id == b"data":
+                offset = f.tell()
+                break
+            else:
+                f.seek(size + size % 2, os.SEEK_CUR)
+
+    if fmt is None:
+        return None
+    tag, channels, sr, block_align, bits = fmt
+    if channels == 0 or block_align != channels * bits // 8:
+        return None
+
+    # Tamanho do chunk pode estar errado (gravação interrompida): limita ao arquivo
+    data_size = min(size, os.path.getsize(file_path) - offset)
+    return offset, data_size // block_align, channels, sr, tag, bits
+
+# ---------------------------
+# MAPPED VIEWS
+# ---------------------------
+
+class PCMView:
+    """View somente-leitura de um WAV PCM inteiro mapeado em memória, convertida para float sob demanda.
+
+    Só as páginas do trecho indexado são lidas; o resultado de cada indexação é uma
+    cópia float do trecho (convertida e escalada no mesmo buffer), não o sinal inteiro.
+    """
+
+    def __init__(self, raw, offset, scale, dtype="float32"):
+        self.raw = raw
+        self.offset = offset
+        self.scale = scale
+        self.dtype = np.dtype(dtype)
+
+    def __len__(self):
+        return len(self.raw)
+
+    @property
+    def shape(self):
+        return self.raw.shape
+
+    @property
+    def ndim(self):
+        return self.raw.ndim
+
+    def __getitem__(self, key):
+        out = np.array(self.raw[key], dtype=self.dtype)  # única cópia: as operações abaixo são in-place
+        if self.offset:
+            np.subtract(out, self.offset, out=out)
+        np.multiply(out, self.scale, out=out)
+        return out[()] if out.ndim == 0 else out
+
+    def column(self, channel):
+        """PCMView de um canal (view com stride sobre o mesmo mapeamento, sem ler nada)."""
+        return PCMView(self.raw[:, channel], self.offset, self.scale, self.dtype)
+
+    def __array__(self, dtype=None, copy=None):
+        out = self[:]
+        return out if dtype is None else out.astype(dtype)
+
+
+class DownmixView:
+    """Média dos canais de um sinal 2-D (ndarray, memmap ou PCMView), calculada só sobre o trecho indexado."""
+
+    def __init__(self, y, dtype="float32"):
+        self.y = y
+        self.dtype = np.dtype(dtype)
+
+    def __len__(self):
+        return len(self.y)
+
+    @property
+    def shape(self):
+        return (len(self.y),)
+
+    @property
+    def ndim(self):
+        return 1
+
+    def __getitem__(self, key):
+        return np.mean(self.y[key], axis=-1).astype(self.dtype, copy=False)
+
+    def __array__(self, dtype=None, copy=None):
+        out = self[:]
+        return out if dtype is None else out.astype(dtype)
+
+
+def column(y, channel):
+    """Canal `channel` de um sinal 2-D sem copiá-lo: view com stride (ndarray/memmap) ou PCMView do canal."""
+    return y.column(channel) if isinstance(y, PCMView) else y[:, channel]
+
+def open_wav_memmap(file_path, dtype="float32"):
+    """Mapeia o payload de um WAV sem decodificar. Retorna (y, sr) ou None se o formato não puder ser mapeado.
+
+    WAV em ponto flutuante vira um np.memmap direto (cópia zero); PCM inteiro de
+    8/16/32 bits vira um PCMView sobre o np.memmap. Demais formatos (ex.: PCM 24 bits)
+    retornam None para o chamador cair na decodificação normal.
+    """
+    layout = wav_layout(file_path)
+    if layout is None:
+        return None
+    offset, frames, channels, sr, tag, bits = layout
+    if (tag, bits) not in _WAV_FORMATS or frames == 0:
+        return None
+
+    file_dtype, zero, scale = _WAV_FORMATS[(tag, bits)]
+    shape = (frames,) if channels == 1 else (frames, channels)
+    raw = np.memmap(file_path, dtype=file_dtype, mode="r", offset=offset, shape=shape)
+    if tag == 3:
+        return raw, sr
+    return PCMView(raw, zero, scale, dtype), sr
@@ -0,0 +1,139 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import numpy as np
+
+# ---------------------------
+# HELPERS
+# ---------------------------
+
+def _sum_squares(a, axis):
+    """Soma dos quadrados sem alocar uma cópia do tamanho do sinal."""
+    if axis == 1:
+        return np.einsum("ij...,ij...->i...", a, a)
+    return np.einsum("j...,j...->...", a, a)
+
+def _blockwise(a, block, func):
+    """Aplica `func` em blocos de `block` itens ao longo do eixo 0 (último bloco pode ser menor)."""
+    n_full = len(a) // block
+    out = func(a[:n_full * block].reshape((n_full, block) + a.shape[1:]), axis=1)
+    if len(a) > n_full * block:
+        tail = func(a[n_full * block:], axis=0)
+        out = np.concatenate([out, tail[np.newaxis]])
+    return out
+
+def _summarize(a, block):
+    """(mínimos, máximos, soma dos quadrados) por bloco de `block` amostras."""
+    return (
+        _blockwise(a, block, np.min),
+        _blockwise(a, block, np.max),
+        _blockwise(a, block, _sum_squares),
+    )
+
+# ---------------------------
+# PEAK PYRAMID
+# ---------------------------
+
+class PeakLevel:
+    """Um nível da pirâmide: mínimo, máximo e soma dos quadrados por bloco de `block` amostras."""
+    __slots__ = ("block", "mins", "maxs", "sumsq")
+
+    def __init__(self, block, mins, maxs, sumsq):
+        self.block = block
+        self.mins = mins
+        self.maxs = maxs
+        self.sumsq = sumsq
+
+    def __len__(self):
+        return len(self.mins)
+
+
+class PeakPyramid:
+    """Resumo multi-resolução (min/max/RMS) do sinal, usado para desenhar a waveform.
+
+    O nível base é calculado numa única passada vetorizada sobre o sinal (de uma vez
+    ou bloco a bloco via `update()`); os níveis seguintes são obtidos reduzindo o nível
+    anterior por `factor` em `finalize()`, sem voltar ao áudio.
+    """
+
+    def __init__(self, y=None, sr=None, base_block=64, factor=4, min_bins=256):
+        self.sr = sr
+        self.n_samples = 0
+        self.base_block = base_block
+        self.factor = factor
+        self.min_bins = min_bins
+        self.levels = []
+        self._parts = []  # nível base parcial, um item por bloco recebido
+        self._carry = None  # amostras que ainda não completam um bloco base
+
+        if y is not None:
+            self.update(y)
+            self.finalize()
+
+    def update(self, chunk):
+        """Acumula o nível base de mais um trecho do sinal (modo streaming)."""
+        self.n_samples += len(chunk)
+        if self._carry is not None:
+            chunk = np.concatenate([self._carry, chunk])
+            self._carry = None
+
+        n_full = len(chunk) // self.base_block * self.base_block
+        if n_full:
+            self._parts.append(_summarize(chunk[:n_full], self.base_block))
+        if n_full < len(chunk):
+            self._carry = np.array(chunk[n_full:])
+
+    def finalize(self):
+        """Fecha o nível base (incluindo o bloco final incompleto) e monta os níveis superiores."""
+        if self._carry is not None:
+            self._parts.append(_summarize(self._carry, self.base_block))
+            self._carry = None
+
+        if not self._parts:
+            return self
+
+        mins, maxs, sumsq = (np.concatenate(part) for part in zip(*self._parts))
+        self._parts = []
+        level = PeakLevel(self.base_block, mins, maxs, sumsq)
+        self.levels = [level]
+        while len(level) > self.min_bins:
+            level = PeakLevel(
+                level.block * self.factor,
+                _blockwise(level.mins, self.factor, np.min),
+                _blockwise(level.maxs, self.factor, np.max),
+                _blockwise(level.sumsq, self.factor, np.sum),
+            )
+            self.levels.append(level)
+        return self
+
+    @property
+    def nbytes(self):
+        """Memória ocupada pelos níveis (bytes)."""
+        return sum(l.mins.nbytes + l.maxs.nbytes + l.sumsq.nbytes for l in self.levels)
+
+    def level_for(self, span, n_pixels):
+        """Retorna o nível mais grosso que ainda tem `n_pixels` blocos em `span` amostras (None = usar amostras brutas)."""
+        for level in reversed(self.levels):
+            if span / level.block >= n_pixels:
+                return level
+        return None
+
+    def fetch(self, n_pixels, t0=0.0, t1=None):
+        """Retorna (t, mins, maxs, rms) para o intervalo [t0, t1], ou None se a resolução pedida exigir amostras brutas."""
+        s0 = max(0, int(t0 * self.sr))
+        s1 = self.n_samples if t1 is None else min(self.n_samples, int(np.ceil(t1 * self.sr)))
+        level = self.level_for(max(1, s1 - s0), n_pixels)
+        if level is None:
+            return None
+
+        b0 = s0 // level.block
+        b1 = -(-s1 // level.block)
+        starts = np.arange(b0, b1) * level.block
+        counts = np.minimum(level.block, self.n_samples - starts)
+        if level.sumsq.ndim > 1:
+            counts = counts[:, np.newaxis]
+
+        t = starts / self.sr
+        rms = np.sqrt(level.sumsq[b0:b1] / counts)
+        return t, level.mins[b0:b1], level.maxs[b0:b1], rms
@@ -0,0 +1,129 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import threading
+
+# ---------------------------
+# PLAYBACK ENGINE
+# ---------------------------
+
+class PlaybackEngine:
+    """Reprodução por callback sobre um sd.OutputStream persistente, com relógio em amostras.
+
+    O callback lê direto do buffer carregado (fatias são views, sem cópia do restante
+    do áudio). Pausar, retomar e buscar só mudam o estado lido pelo callback; o
+    dispositivo só é reaberto quando a taxa de amostragem ou o número de canais mudam.
+    """
+
+    def __init__(self, notify_interval=1 / 60):
+        self.notify_interval = notify_interval  # segundos de áudio entre avisos de posição
+        self.on_position = None  # callable(tempo_s), chamado da thread de áudio
+        self.on_finished = None  # callable(), chamado da thread de áudio
+
+        self._stream = None
+        self._buffer = None
+        self._sr = None
+        self._pos = 0
+        self._playing = False
+        self._last_notified = 0
+        self._lock = threading.Lock()
+
+    # ---------------------------
+    # STATE
+    # ---------------------------
+
+    @property
+    def position(self):
+        """Próxima amostra a ser entregue ao dispositivo."""
+        return self._pos
+
+    @property
+    def time(self):
+        return self._pos / self._sr if self._sr else 0.0
+
+    @property
+    def playing(self):
+        return self._playing
+
+    # ---------------------------
+    # CONTROLS
+    # ---------------------------
+
+    def start(self, y, sr, start_sample=0):
+        """Toca `y` a partir de `start_sample`, reaproveitando o stream aberto quando possível."""
+        channels = 1 if y.ndim == 1 else y.shape[1]
+        self._ensure_stream(sr, channels)
+        with self._lock:
+            self._buffer = y
+            self._sr = sr
+            self._pos = min(max(0, start_sample), len(y))
+            self._last_notified = self._pos
+            self._playing = True
+
+    def pause(self):
+        with self._lock:
+            self._playing = False
+        return self._pos
+
+    def resume(self):
+        with self._lock:
+            if self._buffer is not None and self._pos < len(self._buffer):
+                self._playing = True
+
+    def seek(self, sample):
+        """Move o relógio para `sample` sem parar nem reabrir o stream."""
+        with self._lock:
+            if self._buffer is not None:
+                self._pos = min(max(0, sample), len(self._buffer))
+                self._last_notified = self._pos
+
+    def close(self):
+        """Fecha o dispositivo de saída."""
+        with self._lock:
+            self._playing = False
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    # ---------------------------
+    # AUDIO THREAD
+    # ---------------------------
+
+    def _ensure_stream(self, sr, channels):
+        stream = self._stream
+        if stream is not None and stream.samplerate == sr and stream.channels == channels:
+            return
+        import sounddevice as sd  # PortAudio só é carregado na primeira reprodução
+
+        self.close()
+        self._stream = sd.OutputStream(
+            samplerate=sr, channels=channels, dtype='float32', callback=self._callback
+        )
+        self._stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        finished = False
+        with self._lock:
+            if not self._playing:
+                outdata.fill(0)
+                return
+            start = self._pos
+            chunk = self._buffer[start:start + frames]
+            n = len(chunk)
+            outdata[:n] = chunk.reshape(n, -1)
+            outdata[n:] = 0
+            self._pos = start + n
+
+            notify = self._pos - self._last_notified >= self.notify_interval * self._sr
+            if notify:
+                self._last_notified = self._pos
+            if self._pos >= len(self._buffer):
+                self._playing = False
+                finished = True
+            pos = self._pos
+
+        if (notify or finished) and self.on_position is not None:
+            self.on_position(pos / self._sr)
+        if finished and self.on_finished is not None:
+            self.on_finished()
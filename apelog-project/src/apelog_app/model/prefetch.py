@@ -0,0 +1,100 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------------------------
+# PREFETCHER
+# ---------------------------
+
+class Prefetcher:
+    """Pré-carrega em threads os vizinhos do arquivo atual na playlist, alimentando o cache do modelo.
+
+    Cada job decodifica o áudio e calcula pirâmide de picos e estatísticas. Jobs de
+    arquivos que saíram da vizinhança são cancelados (inclusive os que já começaram,
+    que param no próximo bloco decodificado).
+    """
+
+    def __init__(self, model, radius=2, workers=2):
+        self.model = model
+        self.radius = radius
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="apelog-prefetch")
+        self._jobs = {}  # {file_path: (Future, threading.Event de cancelamento)}
+        self._lock = threading.RLock()
+
+    def neighbours(self, audio_files, current):
+        """Próximos e anteriores `radius` arquivos (circular), do mais próximo ao mais distante."""
+        if current not in audio_files:
+            return []
+        index = audio_files.index(current)
+        paths = []
+        for distance in range(1, self.radius + 1):
+            for j in (index + distance, index - distance):
+                path = audio_files[j % len(audio_files)]
+                if path != current and path not in paths:
+                    paths.append(path)
+        return paths
+
+    def schedule(self, audio_files, current):
+        """Agenda os vizinhos de `current` e cancela o que ficou fora da vizinhança."""
+        wanted = self.neighbours(list(audio_files), current)
+        with self._lock:
+            for path in [p for p in self._jobs if p not in wanted and p != current]:
+                self._cancel(path)
+            self.prefetch(wanted)
+
+    def prefetch(self, paths):
+        """Agenda o pré-carregamento de `paths` (os que já estão no cache ou em andamento são ignorados)."""
+        with self._lock:
+            for path in paths:
+                if path in self._jobs or path in self.model.cache:
+                    continue
+                cancelled = threading.Event()
+                future = self._executor.submit(self._warm, path, cancelled)
+                self._jobs[path] = (future, cancelled)
+                future.add_done_callback(lambda f, p=path: self._forget(p, f))
+
+    def wait(self, file_path, timeout=None):
+        """Se `file_path` está sendo pré-carregado, espera o job terminar (evita decodificar duas vezes)."""
+        with self._lock:
+            job = self._jobs.get(file_path)
+        if job is None:
+            return
+        try:
+            job[0].result(timeout)
+        except Exception:
+            pass  # cancelado ou falhou: o chamador decodifica normalmente
+
+    def shutdown(self):
+        """Cancela todos os jobs e libera as threads."""
+        with self._lock:
+            for path in list(self._jobs):
+                self._cancel(path)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _cancel(self, file_path):
+        future, cancelled = self._jobs.pop(file_path)
+        cancelled.set()
+        future.cancel()
+
+    def _forget(self, file_path, future):
+        with self._lock:
+            job = self._jobs.get(file_path)
+            if job is not None and job[0] is future:
+                del self._jobs[file_path]
+
+    def _warm(self, file_path, cancelled):
+        """Job do worker: decodifica, resume e guarda no cache."""
+        try:
+            entry = self.model._decode(file_path, cancelled)
+            if entry is None or cancelled.is_set():
+                return
+            if entry.peaks is None or entry.stats is None:
+                entry.peaks, entry.stats = self.model._summarize(entry.y, entry.sr)
+                self.model._save_summaries(file_path, entry.peaks, entry.stats)
+            if not cancelled.is_set():
+                self.model.cache.put(file_path, entry)
+        except Exception as e:
+            print(f"Erro ao pré-carregar {file_path}: {e}")
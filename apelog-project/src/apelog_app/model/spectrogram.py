@@ -0,0 +1,154 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from apelog_app import profiling
+
+# ---------------------------
+# SPECTROGRAM TILES
+# ---------------------------
+
+class SpectrogramTiles:
+    """Espectrograma (STFT em dB) calculado em tiles sob demanda, num pool de threads, com cache LRU.
+
+    Cada nível de zoom tem um hop em potência de 2 (uma coluna por pixel, no máximo);
+    um tile são `tile_columns` colunas consecutivas de um nível. Só os tiles que cobrem
+    a visão atual são calculados, e cada coluna usa só a janela de `n_fft` amostras em
+    torno do seu centro: afastado, o custo depende da largura em pixels e não da
+    duração do arquivo. Tiles já calculados são reaproveitados no pan e ao voltar a um zoom.
+    """
+
+    def __init__(self, n_fft=1024, fmax=8000.0, tile_columns=256, workers=2, max_bytes=64 * 1024 ** 2):
+        self.n_fft = n_fft
+        self.fmax = fmax  # Hz; None = até Nyquist
+        self.tile_columns = tile_columns
+        self.max_bytes = max_bytes
+        self.floor_db = -90.0  # dB abaixo do fundo de escala mostrados como o mínimo do colormap
+        self.on_ready = None  # callable(), chamado da thread do worker quando um tile fica pronto
+
+        self._window = np.hanning(n_fft).astype(np.float32)
+        self._ref = self._window.sum() / 2  # senoide de fundo de escala = 0 dB
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="apelog-spectrogram")
+        self._tiles = OrderedDict()  # {(arquivo, mtime, tamanho, nível, k): array (bins, colunas)}
+        self._pending = {}  # {chave: Future} dos tiles sendo calculados
+        self._wanted = set()  # chaves da visão atual (jobs fora dela são descartados)
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def level_for(self, span, n_pixels):
+        """Nível de zoom (hop = 2**nível amostras) para mostrar `span` amostras em `n_pixels` colunas."""
+        hop = max(self.n_fft // 4, span / max(1, n_pixels))
+        return int(np.ceil(np.log2(hop)))
+
+    def bins(self, sr):
+        """Número de bins de frequência guardados por coluna (até `fmax`)."""
+        n_bins = self.n_fft // 2 + 1
+        if self.fmax is None:
+            return n_bins
+        return min(n_bins, int(self.fmax * self.n_fft / sr) + 1)
+
+    def visible(self, file_path, y, sr, t0, t1, n_pixels):
+        """Tiles que cobrem [t0, t1] s: lista de (chave, extent, tile ou None se ainda em cálculo).
+
+        `extent` é (t_início, t_fim, f_min, f_max) para o imshow. Os que faltam são
+        agendados no pool; `on_ready` avisa quando cada um fica pronto.
+        """
+        st = os.stat(file_path)
+        source = (os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+
+        s0, s1 = max(0, int(t0 * sr)), min(len(y), int(np.ceil(t1 * sr)))
+        level = self.level_for(max(1, s1 - s0), n_pixels)
+        hop = 2 ** level
+        span = self.tile_columns * hop
+        df = sr / self.n_fft  # bins centrados em b * df
+        f_lo, f_hi = -df / 2, (self.bins(sr) - 0.5) * df
+
+        tiles = []
+        with self._lock:
+            self._wanted = set()
+            for k in range(s0 // span, max(s0 // span, (s1 - 1) // span) + 1):
+                key = source + (level, k)
+                extent = ((k * span - hop / 2) / sr, ((k + 1) * span - hop / 2) / sr, f_lo, f_hi)
+                tile = self._tiles.get(key)
+                if tile is not None:
+                    self._tiles.move_to_end(key)
+                elif key not in self._pending:
+                    self._pending[key] = self._executor.submit(self._job, key, y, sr, level, k)
+                self._wanted.add(key)
+                tiles.append((key, extent, tile))
+        return tiles
+
+    def clear(self, file_path=None):
+        """Descarta os tiles de um arquivo, ou todos."""
+        path = os.path.abspath(file_path) if file_path else None
+        with self._lock:
+            for key in [k for k in self._tiles if path is None or k[0] == path]:
+                self._nbytes -= self._tiles.pop(key).nbytes
+
+    def wait(self):
+        """Espera os tiles agendados até agora (benchmarks e scripts)."""
+        with self._lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---------------------------
+    # WORKER
+    # ---------------------------
+
+    def _job(self, key, y, sr, level, k):
+        try:
+            with self._lock:
+                stale = key not in self._wanted  # o usuário já saiu dessa visão
+            tile = None if stale else self.compute(y, sr, level, k)
+        except Exception as e:
+            print(f"Erro ao calcular o espectrograma: {e}")
+            tile = None
+
+        with self._lock:
+            self._pending.pop(key, None)
+            if tile is None:
+                return
+            self._tiles[key] = tile
+            self._nbytes += tile.nbytes
+            while self._nbytes > self.max_bytes and len(self._tiles) > 1:
+                _, old = self._tiles.popitem(last=False)
+                self._nbytes -= old.nbytes
+        if self.on_ready is not None:
+            self.on_ready()
+
+    @profiling.traced("spectrogram_tile")
+    def compute(self, y, sr, level, k):
+        """Magnitude em dB (bins, tile_columns) do tile `k` do nível `level`; colunas após o fim ficam NaN.
+
+        Cada coluna é a FFT da janela de Hann de `n_fft` amostras centrada em coluna * hop;
+        áudio multicanal é somado (média dos canais) antes da FFT.
+        """
+        hop = 2 ** level
+        half = self.n_fft // 2
+        centers = (k * self.tile_columns + np.arange(self.tile_columns)) * hop
+        inside = centers < len(y)
+
+        index = centers[inside, np.newaxis] - half + np.arange(self.n_fft)
+        valid = (index >= 0) & (index < len(y))
+        frames = np.asarray(y[np.clip(index, 0, len(y) - 1)], dtype=np.float32)  # só as janelas usadas
+        if frames.ndim == 3:
+            frames = frames.mean(axis=2)
+        frames *= valid
+        frames *= self._window
+
+        spectrum = np.fft.rfft(frames, axis=1)[:, :self.bins(sr)]
+        magnitude = np.abs(spectrum).astype(np.float32)
+        tile = np.full((magnitude.shape[1], self.tile_columns), np.nan, dtype=np.float32)
+        tile[:, inside] = 20 * np.log10(np.maximum(magnitude.T, 1e-10) / self._ref)
+        return tile
@@ -0,0 +1,127 @@
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import numpy as np
+
+# ---------------------------
+# RUNNING STATISTICS
+# ---------------------------
+
+class RunningStats:
+    """Média, variância e pico acumulados bloco a bloco.
+
+    Welford generalizado para blocos (combinação de Chan et al.): cada bloco é resumido
+    com NumPy e combinado ao acumulado sem guardar amostras, então o resultado sobre o
+    sinal inteiro é o mesmo de np.std / np.abs().max() sem precisar dele na memória.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.peak = 0.0  # maior |amostra| vista
+
+    def update(self, block):
+        """Incorpora mais um bloco de amostras."""
+        x = np.asarray(block, dtype=np.float64)
+        n = x.size
+        if n == 0:
+            return
+        block_mean = x.mean()
+        block_m2 = np.square(x - block_mean).sum()
+        self.peak = max(self.peak, float(np.abs(x).max()))
+        self._combine(n, block_mean, block_m2)
+
+    def merge(self, other):
+        """Incorpora as estatísticas de outro RunningStats (ex.: de outro trecho do arquivo)."""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+            self.peak = max(self.peak, other.peak)
+
+    def _combine(self, n, mean, m2):
+        delta = mean - self.mean
+        total = self.count + n
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        """Desvio padrão populacional (equivalente a np.std sobre todo o sinal)."""
+        return float(np.sqrt(self.variance))
+
+# ---------------------------
+# WINDOWED STATISTICS
+# ---------------------------
+
+class WindowedStats:
+    """Média, variância e pico das últimas ~`window` amostras (piso de ruído adaptativo).
+
+    As amostras são resumidas em blocos de `block` amostras guardados num anel de
+    tamanho fixo; o bloco mais antigo sai quando um novo se completa. A janela anda em
+    passos de um bloco e a memória não depende da duração do sinal.
+    """
+
+    def __init__(self, window, block=4096):
+        self.block = int(block)
+        slots = max(1, int(np.ceil(window / self.block)))
+        self._counts = np.zeros(slots)
+        self._means = np.zeros(slots)
+        self._m2s = np.zeros(slots)
+        self._peaks = np.zeros(slots)
+        self._slot = 0  # bloco sendo preenchido
+
+    def update(self, block):
+        """Incorpora mais amostras, rotacionando os blocos completos."""
+        x = np.asarray(block, dtype=np.float64).ravel()
+        while x.size:
+            i = self._slot
+            room = self.block - int(self._counts[i])
+            part, x = x[:room], x[room:]
+            self._add(i, part)
+            if self._counts[i] == self.block:
+                self._slot = (i + 1) % len(self._counts)
+                j = self._slot
+                self._counts[j] = self._means[j] = self._m2s[j] = self._peaks[j] = 0.0
+
+    def _add(self, i, x):
+        n = x.size
+        mean = x.mean()
+        m2 = np.square(x - mean).sum()
+        count = self._counts[i]
+        delta = mean - self._means[i]
+        total = count + n
+        self._means[i] += delta * n / total
+        self._m2s[i] += m2 + delta ** 2 * count * n / total
+        self._counts[i] = total
+        self._peaks[i] = max(self._peaks[i], float(np.abs(x).max()))
+
+    @property
+    def count(self):
+        return int(self._counts.sum())
+
+    @property
+    def mean(self):
+        total = self._counts.sum()
+        return float(self._counts @ self._means / total) if total else 0.0
+
+    @property
+    def variance(self):
+        total = self._counts.sum()
+        if not total:
+            return 0.0
+        mean = self._counts @ self._means / total
+        return float((self._m2s.sum() + self._counts @ np.square(self._means - mean)) / total)
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.variance))
+
+    @property
+    def peak(self):
+        return float(self._peaks.max())
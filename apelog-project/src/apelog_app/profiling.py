@@ -0,0 +1,273 @@
+"""Instrumentação leve: spans nomeados, contadores, histogramas e exportação em Chrome trace.
+
+Desligada por padrão; quando desligada, `span()` devolve um objeto vazio compartilhado e
+`traced` só testa uma flag antes de chamar a função original. Liga com `enable()` ou pela
+variável de ambiente APELOG_PROFILE=<arquivo.json> (APELOG_PROFILE_MEMORY=1 liga também o
+tracemalloc). O trace abre em chrome://tracing ou https://ui.perfetto.dev.
+"""
+
+# ---------------------------
+# IMPORTS
+# ---------------------------
+
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+MAX_EVENTS = 200_000  # eventos guardados para o trace (os mais antigos são descartados)
+
+_enabled = False
+_memory = False
+_lock = threading.Lock()
+_events = deque(maxlen=MAX_EVENTS)  # (nome, início_us, duração_us, pid, tid, args)
+_counters = {}  # {nome: valor}
+_histograms = {}  # {nome: _Histogram}
+_mem_spans = []  # spans abertos com tracemalloc ligado (o pico do tracemalloc é global ao processo)
+
+# ---------------------------
+# HISTOGRAM
+# ---------------------------
+
+class _Histogram:
+    """Durações de um span: contagem, soma, mínimo, máximo e baldes em potências de 2 (µs)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = {}  # {k: contagem de durações em [2^k, 2^(k+1)) µs}
+
+    def add(self, us):
+        self.count += 1
+        self.total += us
+        self.min = min(self.min, us)
+        self.max = max(self.max, us)
+        k = max(0, int(us).bit_length() - 1)
+        self.buckets[k] = self.buckets.get(k, 0) + 1
+
+    def quantile(self, q):
+        """Quantil aproximado (limite superior do balde que o contém), em µs."""
+        target = q * self.count
+        seen = 0
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if seen >= target:
+                return min(float(2 ** (k + 1)), self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total / 1e3,
+            "mean_ms": self.total / self.count / 1e3 if self.count else 0.0,
+            "min_ms": self.min / 1e3 if self.count else 0.0,
+            "max_ms": self.max / 1e3,
+            "p50_ms": self.quantile(0.5) / 1e3,
+            "p95_ms": self.quantile(0.95) / 1e3,
+            "buckets_us": {str(2 ** k): n for k, n in sorted(self.buckets.items())},
+        }
+
+# ---------------------------
+# SPANS
+# ---------------------------
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+def _collect_peak():
+    """Repassa o pico do tracemalloc desde a última leitura a todos os spans abertos e zera o pico.
+
+    O tracemalloc só tem um pico global: zerando-o a cada abertura/fechamento de span,
+    cada span fica com o maior uso visto enquanto ele estava aberto (spans aninhados ou
+    de outras threads abertos ao mesmo tempo enxergam os picos uns dos outros).
+    """
+    import tracemalloc
+    current, peak = tracemalloc.get_traced_memory()
+    for open_span in _mem_spans:
+        open_span.mem_peak = max(open_span.mem_peak, peak)
+    tracemalloc.reset_peak()
+    return current
+
+class _Span:
+    __slots__ = ("name", "args", "start", "mem_start", "mem_peak")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.mem_start = None
+
+    def __enter__(self):
+        if _memory:
+            with _lock:
+                self.mem_start = self.mem_peak = _collect_peak()
+                _mem_spans.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        if self.mem_start is not None:
+            with _lock:
+                current = _collect_peak()
+                _mem_spans.remove(self)
+            self.args["mem_current_mb"] = round(current / 1024 ** 2, 3)
+            self.args["mem_delta_mb"] = round((current - self.mem_start) / 1024 ** 2, 3)
+            self.args["mem_peak_mb"] = round((self.mem_peak - self.mem_start) / 1024 ** 2, 3)  # acima do início do span
+        record(self.name, self.start, end, self.args)
+        return False
+
+    def set(self, **args):
+        """Anexa argumentos ao span (ex.: número de marcadores encontrados)."""
+        self.args.update(args)
+
+def span(name, **args):
+    """Context manager que mede um trecho: `with profiling.span("decode", file=path): ...`."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+def traced(name):
+    """Decorador: mede cada chamada da função como um span `name`."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def record(name, start_ns, end_ns, args=None):
+    """Registra um span já medido (relógio de perf_counter_ns)."""
+    us = (end_ns - start_ns) / 1e3
+    with _lock:
+        _events.append((name, start_ns / 1e3, us, os.getpid(), threading.get_ident(), args or {}))
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = _Histogram()
+        hist.add(us)
+
+def count(name, n=1):
+    """Incrementa um contador (sem efeito quando desligado)."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+# ---------------------------
+# CONTROL
+# ---------------------------
+
+def enabled():
+    return _enabled
+
+def enable(memory=False):
+    """Liga a coleta; `memory=True` também liga o tracemalloc (bem mais caro)."""
+    global _enabled, _memory
+    if memory:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    _memory = memory
+    _enabled = True
+
+def disable():
+    global _enabled, _memory
+    if _memory:
+        import tracemalloc
+        tracemalloc.stop()
+    _enabled = _memory = False
+
+def reset():
+    """Descarta eventos, contadores e histogramas coletados."""
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _histograms.clear()
+
+def drain():
+    """Retorna e descarta os eventos e contadores deste processo (para juntar os de workers com `merge`)."""
+    with _lock:
+        events, counters = list(_events), dict(_counters)
+        _events.clear()
+        _counters.clear()
+    return {"events": events, "counters": counters}
+
+def merge(data):
+    """Junta eventos e contadores vindos de outro processo (saída de `drain`)."""
+    with _lock:
+        for event in data["events"]:
+            _events.append(tuple(event))
+            hist = _histograms.get(event[0])
+            if hist is None:
+                hist = _histograms[event[0]] = _Histogram()
+            hist.add(event[2])
+        for name, n in data["counters"].items():
+            _counters[name] = _counters.get(name, 0) + n
+
+# ---------------------------
+# REPORTS
+# ---------------------------
+
+def memory_snapshot(limit=15):
+    """Maiores alocações vivas por linha de código (requer enable(memory=True)), ou []."""
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        return []
+    stats = tracemalloc.take_snapshot().statistics("lineno")[:limit]
+    return [{"where": str(stat.traceback[0]), "size_mb": stat.size / 1024 ** 2, "count": stat.count} for stat in stats]
+
+def summary():
+    """Contadores e histogramas por span, em dict serializável."""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "spans": {name: hist.as_dict() for name, hist in sorted(_histograms.items())},
+        }
+
+def report():
+    """Tabela de texto com os spans (ordenados pelo tempo total) e os contadores."""
+    data = summary()
+    lines = [f"{'span':<24} {'n':>7} {'total ms':>10} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}"]
+    for name, h in sorted(data["spans"].items(), key=lambda item: -item[1]["total_ms"]):
+        lines.append(f"{name:<24} {h['count']:>7} {h['total_ms']:>10.1f} {h['mean_ms']:>9.2f} "
+                     f"{h['p95_ms']:>9.2f} {h['max_ms']:>9.2f}")
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f"{name:<24} {value:>7}")
+    return "\n".join(lines)
+
+def export_chrome_trace(path):
+    """Escreve os eventos no formato Chrome trace (JSON), com resumo e memória em `otherData`."""
+    with _lock:
+        events = list(_events)
+    trace = [
+        {"name": name, "cat": "apelog", "ph": "X", "ts": ts, "dur": dur, "pid": pid, "tid": tid, "args": args}
+        for name, ts, dur, pid, tid, args in events
+    ]
+    other = summary()
+    other["memory"] = memory_snapshot()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms", "otherData": other}, f, default=str)
+    return path
+
+# Ativação pelo ambiente (o app e o CLI exportam ao sair)
+TRACE_PATH = os.environ.get("APELOG_PROFILE") or None
+if TRACE_PATH:
+    enable(memory=os.environ.get("APELOG_PROFILE_MEMORY") == "1")
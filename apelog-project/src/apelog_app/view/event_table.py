@@ -0,0 +1,34 @@
+from kivy.properties import NumericProperty, StringProperty
+from kivy.uix.behaviors import ButtonBehavior
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+
+# ---------------------------
+# EVENT TABLE
+# ---------------------------
+
+class EventRow(RecycleDataViewBehavior, ButtonBehavior, BoxLayout):
+    """Linha reciclável da tabela de eventos: só as linhas visíveis existem como widgets."""
+    index = NumericProperty(0)
+    marker_id = NumericProperty(-1)
+    time = NumericProperty(0.0)
+    timestamp = StringProperty("")
+    title = StringProperty("")
+    description = StringProperty("")
+    audio_name = StringProperty("")
+
+    def refresh_view_attrs(self, rv, index, data):
+        # O número exibido vem da posição, não dos dados: inserir ou remover não renumera as outras linhas
+        self.index = index
+        return super().refresh_view_attrs(rv, index, data)
+
+class EventTable(BoxLayout):
+    """Cabeçalho + RecycleView com uma linha por marcador (layout em app.kv)."""
+
+    @property
+    def data(self):
+        return self.ids.rv.data
+
+    @data.setter
+    def data(self, rows):
+        self.ids.rv.data = rows
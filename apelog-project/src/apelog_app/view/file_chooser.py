@@ -1,8 +1,9 @@
-from tkinter import filedialog as fd
 from pathlib import Path
 
 def browse_files(controller_callback):
     """Abre um diálogo para seleção de múltiplos arquivos de áudio."""
+    from tkinter import filedialog as fd
+
     filetypes = (
         ('Audio files', '*.mp3 *.wav *.flac *.ogg'),
         ('All files', '*.*')
@@ -14,3 +15,22 @@ def browse_files(controller_callback):
     )
     if filenames:
         controller_callback(filenames)
+
+def browse_save_file(controller_callback, initialfile="clip.wav"):
+    """Abre um diálogo para escolher onde salvar um áudio; o formato vem da extensão escolhida."""
+    from tkinter import filedialog as fd
+
+    filetypes = (
+        ('WAV', '*.wav'),
+        ('FLAC', '*.flac'),
+        ('OGG Vorbis', '*.ogg'),
+    )
+    filename = fd.asksaveasfilename(
+        title='Salvar áudio como',
+        initialdir=str(Path.home()),
+        initialfile=initialfile,
+        defaultextension='.wav',
+        filetypes=filetypes
+    )
+    if filename:
+        controller_callback(filename)
@@ -0,0 +1,97 @@
+"""Cache de análise em disco: ida e volta, chave por parâmetros, evicção por tamanho e invalidação por mtime."""
+
+import os
+
+import numpy as np
+import pytest
+
+from apelog_app.model.analysis_cache import AnalysisCache
+from apelog_app.model.peaks import PeakPyramid
+from apelog_app.model.stats import RunningStats
+
+PARAMS = {"kind": "markers", "chain": [["slice_peak", {"interval": 5.0}]]}
+POINTS = [(1.25, 0.5), (7.5, 0.75)]
+
+# ---------------------------
+# FIXTURES
+# ---------------------------
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / "audio.wav"
+    path.write_bytes(bytes(range(256)) * 1024)
+    return str(path)
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnalysisCache(tmp_path / "cache")
+
+# ---------------------------
+# TESTS
+# ---------------------------
+
+def test_markers_round_trip(cache, audio):
+    assert cache.load_markers(audio, PARAMS) is None
+    cache.save_markers(audio, PARAMS, POINTS)
+    assert cache.load_markers(audio, PARAMS) == POINTS
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_summaries_round_trip(cache, audio):
+    y = np.random.default_rng(5).standard_normal(100_000).astype(np.float32)
+    peaks = PeakPyramid(y, sr=8000)
+    stats = RunningStats()
+    stats.update(y)
+    cache.save_summaries(audio, {"kind": "summary"}, peaks, stats)
+
+    loaded_peaks, loaded_stats = cache.load_summaries(audio, {"kind": "summary"})
+    assert loaded_peaks.n_samples == peaks.n_samples
+    assert len(loaded_peaks.levels) == len(peaks.levels)
+    for level, loaded in zip(peaks.levels, loaded_peaks.levels):
+        assert loaded.block == level.block
+        np.testing.assert_array_equal(loaded.maxs, level.maxs)
+        np.testing.assert_array_equal(loaded.sumsq, level.sumsq)
+    assert (loaded_stats.count, loaded_stats.std, loaded_stats.peak) == (stats.count, stats.std, stats.peak)
+
+def test_params_change_misses(cache, audio):
+    cache.save_markers(audio, PARAMS, POINTS)
+    assert cache.load_markers(audio, {**PARAMS, "channel_mode": "channels"}) is None
+    assert cache.misses == 1
+
+def test_rename_keeps_entry(cache, audio, tmp_path):
+    cache.save_markers(audio, PARAMS, POINTS)
+    moved = str(tmp_path / "moved.wav")
+    os.replace(audio, moved)
+    assert cache.load_markers(moved, PARAMS) == POINTS
+
+def test_write_invalidates_same_size_edit(cache, audio):
+    cache.save_markers(audio, PARAMS, POINTS)
+    st = os.stat(audio)
+    with open(audio, "r+b") as f:
+        f.seek(st.st_size // 4)  # fora dos trechos amostrados pela impressão digital
+        f.write(b"\xff" * 16)
+    os.utime(audio, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert cache.load_markers(audio, PARAMS) is None
+
+def test_eviction_keeps_under_max_bytes(cache, tmp_path):
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"audio{i}.wav"
+        path.write_bytes(bytes([i]) * 4096)
+        paths.append(str(path))
+
+    cache.save_markers(paths[0], PARAMS, POINTS)
+    cache.max_bytes = 3 * cache.nbytes
+    for i, path in enumerate(paths):
+        cache.save_markers(path, PARAMS, POINTS)
+        entry = cache._path(path, "markers", PARAMS)
+        os.utime(entry, (i + 1, i + 1))  # mtime em ordem de gravação: a primeira é a menos usada
+
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.load_markers(paths[-1], PARAMS) == POINTS  # a mais recente sobrevive
+    assert cache.load_markers(paths[0], PARAMS) is None  # a mais antiga sai
+
+def test_clear(cache, audio):
+    cache.save_markers(audio, PARAMS, POINTS)
+    cache.clear()
+    assert cache.nbytes == 0
+    assert cache.load_markers(audio, PARAMS) is None
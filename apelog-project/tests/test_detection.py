@@ -0,0 +1,116 @@
+"""Regressão: detecção vetorizada idêntica à implementação original (fatia a fatia, np.correlate, np.std)."""
+
+import numpy as np
+import pytest
+
+from apelog_app.model.audio import MediaModel
+from apelog_app.model.stats import RunningStats
+
+SR = 22050
+DURATION = 33.3  # s; a última fatia de 5 s fica incompleta
+
+# ---------------------------
+# REFERENCE (código original)
+# ---------------------------
+
+def reference_fundamental_freq(model, peaks_points):
+    frequencies = []
+    for peak in peaks_points:
+        start = max(0, peak[0] - 0.2)
+        duration = 0.4
+        if start + duration > model.duration:
+            duration = model.duration - start
+
+        seg = model.segment(start=start, duration=duration)
+        if len(seg.ys) < 300:
+            frequencies.append(0)
+            continue
+
+        ys = np.asarray(seg.ys, dtype=np.float64)
+        corrs = np.correlate(ys, ys, mode='full')
+        corrs = corrs[len(corrs)//2:]
+        corrs /= np.max(np.abs(corrs))
+
+        lag = np.argmax(corrs[150:250]) + 150
+        period = lag / seg.framerate
+        frequencies.append(1 / period if period > 0 else 0)
+    return frequencies
+
+def reference_markers(model, interval=5.0):
+    num_slices = max(1, int(model.duration / interval))
+    amp_threshold = 0.05 + (np.std(model.y) * 15)
+
+    local_maxima_points = []
+    for i in range(num_slices):
+        start_time = i * interval
+        duration = min(interval, model.duration - start_time)
+        seg = model.segment(start=start_time, duration=duration)
+        if len(seg.ys) == 0:
+            continue
+        result = np.argmax(seg.ys)
+        if seg.ys[result] > amp_threshold:
+            local_maxima_points.append((seg.ts[result], seg.ys[result]))
+
+    frequencies = reference_fundamental_freq(model, local_maxima_points)
+    return [point for i, point in enumerate(local_maxima_points) if frequencies[i] >= 90]
+
+# ---------------------------
+# FIXTURES
+# ---------------------------
+
+def make_model(y, sr=SR):
+    model = MediaModel()
+    model.y, model.sr = y, sr
+    model.duration = len(y) / sr
+    return model
+
+@pytest.fixture(params=["float64", "float32"])
+def model(request):
+    """Ruído de fundo + rajadas tonais em instantes fixos (a de 85 Hz é descartada pelo filtro de frequência)."""
+    rng = np.random.default_rng(7)
+    n = int(DURATION * SR)
+    y = 0.003 * rng.standard_normal(n)
+    t = np.arange(int(0.04 * SR)) / SR
+    for onset, freq, amp in [(2.9, 220, 0.9), (7.1, 130, 0.7), (12.4, 85, 0.8), (18.2, 180, 0.6),
+                             (26.0, 300, 0.95), (31.5, 110, 0.5)]:
+        s = int(onset * SR)
+        y[s:s + len(t)] += amp * np.sin(2 * np.pi * freq * t) * np.hanning(len(t))
+    return make_model(y.astype(request.param))
+
+# ---------------------------
+# TESTS
+# ---------------------------
+
+def test_running_stats_matches_numpy(model):
+    stats = RunningStats()
+    for start in range(0, len(model.y), 65536):
+        stats.update(model.y[start:start + 65536])
+    y = np.asarray(model.y, dtype=np.float64)
+    assert stats.count == len(y)
+    assert stats.std == pytest.approx(np.std(y), rel=1e-12)
+    assert stats.peak == np.abs(y).max()
+
+def test_global_threshold_matches_numpy(model):
+    _, starts, ends = model._slice_bounds(5.0)
+    threshold = model._amp_thresholds(starts, ends, 15)
+    assert threshold == pytest.approx(0.05 + np.std(np.asarray(model.y, dtype=np.float64)) * 15, rel=1e-12)
+
+@pytest.mark.parametrize("interval", [0.5, 1.0, 5.0, 7.3, 40.0])
+def test_slice_peaks_match_per_slice_argmax(model, interval):
+    _, starts, ends = model._slice_bounds(interval)
+    idx, amps = model._slice_peaks(starts, ends)
+    for i, (s, e) in enumerate(zip(starts, ends)):
+        assert idx[i] == np.argmax(model.y[s:e])
+        assert amps[i] == model.y[s + idx[i]]
+
+def test_fundamental_freq_matches_correlate(model):
+    points = [(t, 0.0) for t in (0.05, 2.95, 7.2, 12.5, 18.3, 26.1, 31.6, DURATION - 0.01)]
+    np.testing.assert_allclose(
+        model._estimate_fundamental_freq(points), reference_fundamental_freq(model, points), rtol=1e-12
+    )
+
+def test_detect_signal_matches_reference(model):
+    expected = reference_markers(model)
+    assert expected  # o sinal de teste precisa produzir marcadores
+    assert model._detect_signal(5.0) == expected
+    assert model._auto_generate_markers(interval=5.0) == expected
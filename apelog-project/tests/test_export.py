@@ -0,0 +1,90 @@
+"""Exportação de trechos: limites das listas de trechos, cópia exata e nenhum arquivo parcial em cancelamento ou erro."""
+
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from apelog_app.model.export import SegmentExporter, clips_around, clips_between
+
+SR = 8000
+
+# ---------------------------
+# FIXTURES
+# ---------------------------
+
+@pytest.fixture
+def source(tmp_path):
+    """3 s estéreo PCM 16 bits com amostras distintas (cópias erradas aparecem na comparação)."""
+    rng = np.random.default_rng(11)
+    y = rng.integers(-30000, 30000, size=(3 * SR, 2), dtype=np.int16)
+    path = tmp_path / "source.wav"
+    sf.write(path, y, SR, subtype="PCM_16")
+    return str(path), y
+
+def listing(directory):
+    return sorted(os.listdir(directory))
+
+# ---------------------------
+# CLIP LISTS
+# ---------------------------
+
+def test_clips_around_clamps_to_audio():
+    assert clips_around([2.9, 0.2, 1.0], 3.0) == [(0.0, 0.7), (0.5, 1.5), (2.4, 3.0)]
+    assert clips_around([1.0], 3.0, pre_roll=0.25, post_roll=0.0) == [(0.75, 1.0)]
+
+def test_clips_between_pairs_sorted_markers():
+    assert clips_between([2.0, 0.5, 1.0, 2.5], 3.0) == [(0.5, 1.0), (2.0, 2.5)]
+    assert clips_between([0.1, 1.0, 2.0], 3.0, pre_roll=0.5, post_roll=0.5) == [(0.0, 1.5)]  # 2.0 fica sem par
+    assert clips_between([2.0, 2.9], 3.0, post_roll=0.5) == [(2.0, 3.0)]
+    assert clips_between([1.0], 3.0) == []
+
+# ---------------------------
+# EXPORT
+# ---------------------------
+
+def test_export_clips_copies_samples_exactly(source, tmp_path):
+    path, y = source
+    paths = SegmentExporter(path, blocksize=1000).export_clips([(0.5, 1.25), (2.0, 3.0)], tmp_path / "out")
+    for out, (start, end) in zip(paths, [(0.5, 1.25), (2.0, 3.0)]):
+        data, sr = sf.read(out, dtype="int16")
+        assert sr == SR
+        np.testing.assert_array_equal(data, y[int(start * SR):int(end * SR)])
+    assert not [name for name in listing(tmp_path / "out") if name.endswith(".tmp")]
+
+def test_export_concatenated_inserts_gap(source, tmp_path):
+    path, y = source
+    out = SegmentExporter(path).export_concatenated([(0.0, 0.5), (1.0, 1.5)], str(tmp_path / "all.flac"), gap=0.25)
+    data, _ = sf.read(out, dtype="int16")
+    silence = np.zeros((SR // 4, 2), dtype=np.int16)
+    np.testing.assert_array_equal(data, np.concatenate([y[:SR // 2], silence, y[SR:SR * 3 // 2]]))
+
+def test_cancel_leaves_no_files(source, tmp_path):
+    path, _ = source
+    exporter = SegmentExporter(path, blocksize=100)
+    exporter.cancel()
+    assert exporter.export_concatenated([(0.0, 2.0)], str(tmp_path / "all.wav")) is None
+    assert exporter.export_clips([(0.0, 1.0), (1.0, 2.0)], tmp_path / "clips") == [None, None]
+    assert listing(tmp_path) == ["clips", "source.wav"]
+    assert listing(tmp_path / "clips") == []
+
+def test_failed_read_leaves_no_partial_file(source, tmp_path, monkeypatch):
+    path, _ = source
+    exporter = SegmentExporter(path, blocksize=100)
+    copy = exporter._copy
+    calls = []
+
+    def failing_copy(writer, start, end):
+        calls.append(start)
+        if len(calls) == 2:
+            raise OSError("leitura falhou")
+        return copy(writer, start, end)
+
+    monkeypatch.setattr(exporter, "_copy", failing_copy)
+    out = tmp_path / "all.wav"
+    out.write_bytes(b"anterior")  # um arquivo existente não pode ser truncado
+    with pytest.raises(OSError):
+        exporter.export_concatenated([(0.0, 1.0), (1.0, 2.0)], str(out))
+    assert out.read_bytes() == b"anterior"
+    assert listing(tmp_path) == ["all.wav", "source.wav"]
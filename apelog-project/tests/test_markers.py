@@ -0,0 +1,81 @@
+"""MarkerStore: IDs estáveis, índice ordenado e consultas por tempo iguais às de uma lista simples."""
+
+import numpy as np
+import pytest
+
+from apelog_app.model.markers import AUTO, MANUAL, MarkerStore
+
+# ---------------------------
+# FIXTURES
+# ---------------------------
+
+@pytest.fixture
+def store():
+    """Automáticos em 1, 3, 5 s e manuais em 2 e 3 s (tempo repetido entre tipos)."""
+    store = MarkerStore()
+    store.add_many([5.0, 1.0, 3.0], AUTO)
+    store.add(2.0)
+    store.add(3.0, MANUAL)
+    return store
+
+def reference(store):
+    """(tempo, id) em ordem de tempo, reconstruído só pelos dicts."""
+    return sorted((time, marker_id) for marker_id, time in store.time_of.items())
+
+# ---------------------------
+# TESTS
+# ---------------------------
+
+def test_ids_are_stable_across_edits(store):
+    ids = dict(store.time_of)
+    assert list(ids) == [0, 1, 2, 3, 4]  # add_many devolve IDs na ordem recebida
+    assert ids[0] == 5.0 and ids[1] == 1.0
+
+    store.remove(1)
+    new_id = store.add(0.5)
+    assert new_id == 5  # IDs removidos não são reaproveitados
+    assert all(store.time_of[i] == ids[i] for i in (0, 2, 3, 4))
+    assert store.times().tolist() == [0.5, 2.0, 3.0, 3.0, 5.0]
+    assert 1 not in store and new_id in store
+
+def test_sorted_index_matches_dicts(store):
+    rng = np.random.default_rng(2)
+    for _ in range(200):
+        if len(store) and rng.random() < 0.4:
+            store.remove(int(rng.choice(store.ids())))
+        else:
+            store.add(float(rng.integers(0, 50)) / 4, AUTO if rng.random() < 0.5 else MANUAL)
+        # Empates ficam em ordem de inserção, que é a ordem dos IDs
+        assert list(zip(store.times().tolist(), store.ids().tolist())) == reference(store)
+        assert all(store.time_of[i] == t for i, t in store)
+
+def test_views_are_read_only(store):
+    with pytest.raises(ValueError):
+        store.times()[0] = 10.0
+
+def test_in_range_is_inclusive(store):
+    assert [store.time_of[i] for i in store.in_range(2.0, 3.0)] == [2.0, 3.0, 3.0]
+    assert store.in_range(3.5, 4.5) == []
+    assert store.in_range(-1.0, 10.0) == store.ids().tolist()
+    assert store.visible(0.0, 3.0, MANUAL).tolist() == [2.0, 3.0]
+
+def test_nearest_and_find(store):
+    assert store.time_of[store.nearest(1.4)] == 1.0
+    assert store.time_of[store.nearest(1.6)] == 2.0
+    assert store.time_of[store.nearest(99.0)] == 5.0
+    assert store.time_of[store.nearest(-3.0)] == 1.0
+    assert MarkerStore().nearest(1.0) is None
+
+    assert store.kinds[store.find(3.0, MANUAL)] == MANUAL
+    assert store.kinds[store.find(3.0, AUTO)] == AUTO
+    assert store.find(2.5) is None
+
+def test_remove_kind(store):
+    store.info[0] = {"title": "editado"}
+    removed = store.remove_kind(AUTO)
+    assert sorted(removed) == [0, 1, 2]
+    assert store.times().tolist() == [2.0, 3.0]
+    assert store.kind_ids(AUTO) == []
+    assert store.kind_ids(MANUAL) == [3, 4]
+    assert 0 not in store.info and 0 not in store.kinds
+    assert store.remove_kind(AUTO) == []
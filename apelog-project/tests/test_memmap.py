@@ -0,0 +1,61 @@
+"""Detecção sobre WAV mapeado em memória: mesmos marcadores e pico de memória bem abaixo do sinal em float32."""
+
+import tracemalloc
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from apelog_app.model.audio import MediaModel
+from apelog_app.model.pcm import PCMView
+
+SR = 44100
+DURATION = 120.0  # s
+
+# ---------------------------
+# FIXTURES
+# ---------------------------
+
+def write_wav(path, channels):
+    """Ruído de fundo + uma rajada de 220 Hz a cada 7 s, PCM 16 bits."""
+    rng = np.random.default_rng(3)
+    n = int(DURATION * SR)
+    y = 0.003 * rng.standard_normal((n, channels))
+    t = np.arange(int(0.04 * SR)) / SR
+    burst = 0.8 * np.sin(2 * np.pi * 220 * t) * np.hanning(len(t))
+    for i, onset in enumerate(np.arange(3.0, DURATION - 1, 7.0)):
+        s = int(onset * SR)
+        y[s:s + len(t), i % channels] += burst
+    sf.write(path, y if channels > 1 else y[:, 0], SR, subtype="PCM_16")
+    return n * channels
+
+def load(path, memory_map, channel_mode="downmix"):
+    model = MediaModel()
+    model.memory_map = memory_map
+    model.channel_mode = channel_mode
+    assert model._librosa_load(str(path))
+    model._ensure_summaries()  # pirâmide e estatísticas fora da medição
+    return model
+
+# ---------------------------
+# TESTS
+# ---------------------------
+
+@pytest.mark.parametrize("channels, channel_mode", [(1, "downmix"), (2, "downmix"), (2, "channels")])
+def test_mapped_detection_peak_memory(tmp_path, channels, channel_mode):
+    path = tmp_path / "long.wav"
+    signal_bytes = write_wav(path, channels) * 4  # sinal inteiro em float32 (21 MB por canal)
+
+    model = load(path, memory_map=True, channel_mode=channel_mode)
+    assert isinstance(model.y, PCMView)
+
+    tracemalloc.start()
+    try:
+        points = model._auto_generate_markers(interval=5.0)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert points
+    assert peak < signal_bytes / 4
+    assert points == load(path, memory_map=False, channel_mode=channel_mode)._auto_generate_markers(interval=5.0)
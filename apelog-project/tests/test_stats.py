@@ -0,0 +1,39 @@
+"""WindowedStats: estatísticas das últimas amostras iguais às do NumPy sobre a mesma cauda do sinal."""
+
+import numpy as np
+import pytest
+
+from apelog_app.model.stats import WindowedStats
+
+# ---------------------------
+# TESTS
+# ---------------------------
+
+@pytest.mark.parametrize("chunk", [1, 7, 100, 1000, 5000])
+def test_windowed_stats_match_numpy_tail(chunk):
+    rng = np.random.default_rng(4)
+    y = rng.standard_normal(12_345) * np.linspace(0.1, 2.0, 12_345) + 0.3  # nível muda ao longo do sinal
+    window = WindowedStats(window=1000, block=250)  # 4 blocos: 3 completos + o que está sendo preenchido
+
+    for start in range(0, len(y), chunk):
+        window.update(y[start:start + chunk])
+        n = min(start + chunk, len(y))
+        assert window.count == min(n, 750 + n % 250)
+
+        tail = y[n - window.count:n]
+        assert window.mean == pytest.approx(tail.mean(), rel=1e-12)
+        assert window.std == pytest.approx(tail.std(), rel=1e-12)
+        assert window.peak == np.abs(tail).max()
+
+def test_windowed_stats_forget_old_blocks():
+    window = WindowedStats(window=300, block=100)  # 2 blocos completos + o parcial
+    window.update(np.full(100, 5.0))
+    window.update(np.zeros(150))
+    assert window.peak == 5.0  # bloco alto ainda dentro da janela
+    window.update(np.zeros(50))
+    assert (window.peak, window.mean, window.std) == (0.0, 0.0, 0.0)
+
+def test_windowed_stats_empty():
+    window = WindowedStats(window=100, block=10)
+    window.update(np.array([]))
+    assert (window.count, window.mean, window.variance, window.peak) == (0, 0.0, 0.0, 0.0)